@@ -1,7 +1,8 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
+
+from dataset_refresh import IncrementalRiskCounter, file_signature
+from figures import risk_bar_figure
+from summary import load_summary, summary_path
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -10,58 +11,48 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Cache data dengan TTL untuk optimasi performa
-@st.cache_data(ttl=600, show_spinner=False)
-def load_dataset():
-    """Memuat dan memproses data penelitian KRS"""
+DATA_PATH = "penelitian_bersih.xlsx"
+
+# Counter disimpan lintas sesi; pembaruan dipicu perubahan file, bukan timer.
+# Hanya dipakai bila belum ada snapshot ringkasan yang cocok untuk file data
+# (mis. file diperbarui di luar preprocessing): baris yang ditambahkan ke CSV
+# diproses inkremental, sehingga Home tetap benar sampai snapshot dibuat ulang.
+@st.cache_resource(show_spinner=False)
+def get_risk_counter(path):
+    """Counter risiko stunting inkremental untuk file data penelitian KRS"""
+    return IncrementalRiskCounter(path)
+
+@st.cache_data(show_spinner=False)
+def load_summary_statistics(path, signature, snapshot_signature):
+    """
+    Statistik dari snapshot ringkasan milik file `path` (ditulis oleh preprocessing.py
+    atau summary.py; Home tidak pernah menulisnya). None jika snapshot tidak ada,
+    dibuat dari file lain, atau sudah usang. Kunci cache = signature file data dan snapshot.
+    """
     try:
-        data = pd.read_excel("penelitian_bersih.xlsx")
-        
-        # Normalisasi kolom
-        data.columns = [col.lower().replace(' ', '_') for col in data.columns]
-        
-        # Preprocessing risiko stunting
-        if 'risiko_stunting' in data.columns:
-            data['risiko_stunting'] = data['risiko_stunting'].fillna('Tidak Diketahui')
-            data['risiko_stunting'] = data['risiko_stunting'].astype(str).str.strip()
-            
-            # Mapping berbagai format ke standar
-            risk_mapping = {
-                '1': 'Berisiko', '0': 'Tidak Berisiko',
-                'true': 'Berisiko', 'false': 'Tidak Berisiko',
-                'ya': 'Berisiko', 'tidak': 'Tidak Berisiko',
-                'yes': 'Berisiko', 'no': 'Tidak Berisiko',
-                'tinggi': 'Berisiko', 'rendah': 'Tidak Berisiko'
-            }
-            
-            data['risiko_stunting'] = data['risiko_stunting'].str.lower().map(risk_mapping).fillna(data['risiko_stunting'])
-            data['risiko_stunting'] = data['risiko_stunting'].str.title()
-        
-        return data
-    
+        summary = load_summary(summary_path(path), expected_source=path)
+    except Exception:
+        return None
+    return summary['overall'] if summary else None
+
+def current_signature(path):
+    try:
+        return file_signature(path)
+    except OSError:
+        return None
+
+def calculate_statistics(counter):
+    """Memperbarui counter bila file data berubah lalu mengembalikan statistik dasar"""
+    try:
+        counter.refresh()
     except FileNotFoundError:
-        st.error("File data tidak ditemukan. Pastikan file 'penelitian_bersih.xlsx' tersedia.")
+        st.error(f"File data tidak ditemukan. Pastikan file '{counter.path}' tersedia.")
         st.stop()
     except Exception as error:
         st.error(f"Kesalahan saat memuat data: {str(error)}")
         st.stop()
-
-def calculate_statistics(dataframe):
-    """Menghitung statistik dasar dari dataset"""
-    total_records = len(dataframe)
     
-    if 'risiko_stunting' in dataframe.columns:
-        risk_counts = dataframe['risiko_stunting'].value_counts()
-        high_risk = risk_counts.get('Berisiko', 0)
-        low_risk = risk_counts.get('Tidak Berisiko', 0)
-    else:
-        high_risk = low_risk = 0
-    
-    return {
-        'total': total_records,
-        'high_risk': high_risk,
-        'low_risk': low_risk
-    }
+    return counter.statistics()
 
 def display_header():
     """Menampilkan header aplikasi"""
@@ -115,69 +106,23 @@ def display_bar_chart(stats):
     """Menampilkan diagram batang distribusi risiko stunting"""
     st.markdown("### Distribusi Risiko Stunting")
     
-    # Hitung persentase yang benar
-    total = stats['total']
-    if total > 0:
-        persen_tidak_berisiko = (stats['low_risk'] / total) * 100
-        persen_berisiko = (stats['high_risk'] / total) * 100
-    else:
-        persen_tidak_berisiko = 0
-        persen_berisiko = 0
-    
-    # Persiapkan data untuk chart
-    chart_data = pd.DataFrame({
-        'Kategori': ['Tidak Berisiko', 'Berisiko'],
-        'Jumlah': [stats['low_risk'], stats['high_risk']],
-        'Persentase': [persen_tidak_berisiko, persen_berisiko]
-    })
-    
-    # Buat bar chart dengan Plotly
-    fig = px.bar(
-        chart_data, 
-        x='Kategori', 
-        y='Jumlah',
-        color='Kategori',
-        color_discrete_map={
-            'Tidak Berisiko': '#28a745',
-            'Berisiko': '#dc3545'
-        },
-        title='',
-        custom_data=['Persentase']
-    )
-    
-    # Kustomisasi chart dengan format persentase yang lebih jelas
-    fig.update_traces(
-        texttemplate='%{y:,}<br>(%{customdata[0]:.1f}%)',
-        textposition='outside',
-        textfont=dict(size=14, color='black')
-    )
-    
-    fig.update_layout(
-        showlegend=False,
-        xaxis_title="Kategori Risiko",
-        yaxis_title="Jumlah Keluarga",
-        font=dict(size=12),
-        height=500,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin=dict(t=50, b=50, l=50, r=50)
-    )
-    
-    fig.update_xaxes(showgrid=False)
-    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
-    
+    fig = risk_bar_figure(stats)
     st.plotly_chart(fig, use_container_width=True)
 
 # Eksekusi aplikasi utama
 def main():
     display_header()
     
-    # Load dan proses data
-    with st.spinner('Memuat dataset...'):
-        dataset = load_dataset()
-    
-    # Hitung statistik
-    statistics = calculate_statistics(dataset)
+    # Snapshot ringkasan dibaca lebih dulu; data mentah hanya dimuat bila snapshot tidak tersedia
+    signature = current_signature(DATA_PATH)
+    snapshot_signature = current_signature(summary_path(DATA_PATH))
+    statistics = load_summary_statistics(DATA_PATH, signature, snapshot_signature) if signature else None
+    if statistics is None:
+        st.caption(f"ℹ️ Snapshot ringkasan `{summary_path(DATA_PATH)}` belum ada atau usang; statistik dihitung "
+                   f"dari data mentah. Jalankan `python summary.py {DATA_PATH}` agar halaman ini tidak memuat data mentah.")
+        # Hitung statistik (hanya baris yang berubah yang diproses ulang)
+        with st.spinner('Memuat dataset...'):
+            statistics = calculate_statistics(get_risk_counter(DATA_PATH))
     
     # Tampilkan metrik
     display_metrics(statistics)
@@ -0,0 +1,370 @@
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from dataset_refresh import data_sheet_names, read_excel_sheets
+from spatial_index import normalize_region_series
+
+# ===============================
+# Konfigurasi agregasi out-of-core
+# ===============================
+CHUNK_SIZE = 200_000
+# Chunk lebih kecil untuk mode progresif agar hasil sementara cepat muncul
+PROGRESSIVE_CHUNK_SIZE = 50_000
+ROW_ESTIMATE_SAMPLE_BYTES = 1024 * 1024
+SPILL_BUFFER_SIZE = 1024 * 1024
+
+REQUIRED_COLUMNS = ['namakecamatan', 'risiko_stunting', 'lat', 'lon']
+OPTIONAL_COLUMNS = ['namakelurahan', 'tahun']
+
+# Standar WHO: wilayah dengan >20% kasus berisiko = Rentan Stunting
+WHO_THRESHOLD = 20
+
+RISK_REPLACEMENTS = {
+    '1': 'Berisiko', '0': 'Tidak Berisiko',
+    'True': 'Berisiko', 'False': 'Tidak Berisiko',
+    'Yes': 'Berisiko', 'No': 'Tidak Berisiko'
+}
+
+AGGREGATE_COLUMNS = ['total', 'berisiko', 'tidak_berisiko', 'lat_sum', 'lon_sum', 'coord_count']
+
+
+def normalize_risk_column(series):
+    """Menyeragamkan label risiko_stunting (Berisiko / Tidak Berisiko)"""
+    series = series.astype(str).str.strip().str.title()
+    return series.replace(RISK_REPLACEMENTS)
+
+
+def spill_to_tempfile(uploaded_file):
+    """
+    Menyalin file upload ke file sementara di disk lokal
+    secara bertahap, lalu mengembalikan path-nya.
+    File sementara harus dihapus oleh pemanggil.
+    """
+    suffix = '.' + uploaded_file.name.split('.')[-1].lower()
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(uploaded_file, tmp, length=SPILL_BUFFER_SIZE)
+        return tmp.name
+
+
+def _iter_excel_chunks(path, chunksize):
+    """
+    Membaca .xlsx baris demi baris (openpyxl read-only) per chunk.
+    Sheet lanjutan dengan header yang sama pada workbook bertanda split
+    (file besar hasil writers.py dipecah per batas baris XLSX) ikut dibaca berurutan.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        header = None
+        buffer = []
+        for name in data_sheet_names(workbook.sheetnames, workbook.properties.keywords):
+            rows = workbook[name].iter_rows(values_only=True)
+            sheet_header = next(rows, None)
+            if sheet_header is None:
+                continue
+            sheet_header = [str(col).lower() if col is not None else '' for col in sheet_header]
+            if header is None:
+                header = sheet_header
+            elif sheet_header != header:
+                continue
+
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) >= chunksize:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(path, chunksize=CHUNK_SIZE):
+    """
+    Generator chunk DataFrame dari file CSV/Excel di disk.
+    Hanya satu chunk yang berada di memori pada satu waktu.
+    """
+    file_extension = path.split('.')[-1].lower()
+
+    if file_extension == 'csv':
+        yield from pd.read_csv(path, chunksize=chunksize)
+    elif file_extension == 'xlsx':
+        yield from _iter_excel_chunks(path, chunksize)
+    elif file_extension == 'xls':
+        # Format .xls lama tidak mendukung pembacaan streaming
+        yield read_excel_sheets(path)
+    else:
+        raise ValueError("Format file tidak didukung! Gunakan file .csv, .xlsx, atau .xls")
+
+
+def aggregate_chunk(chunk, region_index=None):
+    """
+    Menghitung agregat per (kecamatan, kelurahan, tahun) untuk satu chunk data.
+    Jika region_index diberikan, koordinat yang berada di luar kecamatan
+    tertulis tidak ikut dijumlahkan untuk posisi marker.
+    """
+    chunk = chunk.rename(columns=str.lower)
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing_columns:
+        raise ValueError(f"Kolom yang diperlukan tidak ditemukan: {', '.join(missing_columns)}")
+
+    keys = ['namakecamatan'] + [col for col in OPTIONAL_COLUMNS if col in chunk.columns]
+
+    risk = normalize_risk_column(chunk['risiko_stunting'])
+    lat = pd.to_numeric(chunk['lat'], errors='coerce')
+    lon = pd.to_numeric(chunk['lon'], errors='coerce')
+    has_coord = lat.notna() & lon.notna()
+    if region_index is not None:
+        detected = pd.Series(region_index.lookup(lat, lon), index=chunk.index)
+        has_coord &= detected == normalize_region_series(chunk['namakecamatan'])
+
+    frame = chunk[keys].copy()
+    frame['total'] = 1
+    frame['berisiko'] = (risk == 'Berisiko').astype(np.int64)
+    frame['tidak_berisiko'] = (risk == 'Tidak Berisiko').astype(np.int64)
+    frame['lat_sum'] = lat.where(has_coord, 0.0)
+    frame['lon_sum'] = lon.where(has_coord, 0.0)
+    frame['coord_count'] = has_coord.astype(np.int64)
+
+    return frame.groupby(keys, dropna=False, sort=False, observed=True)[AGGREGATE_COLUMNS].sum()
+
+
+def finalize_aggregates(aggregates):
+    """Mengembalikan counter ke tipe integer dan meratakan index grup menjadi kolom"""
+    counter_columns = ['total', 'berisiko', 'tidak_berisiko', 'coord_count']
+    aggregates[counter_columns] = aggregates[counter_columns].astype(np.int64)
+    return aggregates.reset_index()
+
+
+def aggregate_dataframe(df, region_index=None):
+    """Agregat per wilayah untuk DataFrame yang sudah berada di memori"""
+    return finalize_aggregates(aggregate_chunk(df, region_index))
+
+
+def merge_aggregates(left, right):
+    """Menggabungkan dua tabel agregat dengan menjumlahkan setiap counter"""
+    if left is None:
+        return right
+    return left.add(right, fill_value=0)
+
+
+def aggregate_file(path, chunksize=CHUNK_SIZE, region_index=None):
+    """
+    Scan file secara bertahap dan kembalikan tabel agregat
+    per (kecamatan, kelurahan, tahun). Puncak memori dibatasi oleh ukuran chunk.
+    """
+    aggregates = None
+    for chunk in iter_file_chunks(path, chunksize):
+        aggregates = merge_aggregates(aggregates, aggregate_chunk(chunk, region_index))
+
+    if aggregates is None:
+        return pd.DataFrame(columns=['namakecamatan'] + AGGREGATE_COLUMNS)
+
+    return finalize_aggregates(aggregates)
+
+
+def aggregate_upload(uploaded_file, chunksize=CHUNK_SIZE, region_index=None):
+    """Spill file upload ke disk lokal lalu hitung agregatnya secara out-of-core"""
+    path = spill_to_tempfile(uploaded_file)
+    try:
+        return aggregate_file(path, chunksize, region_index)
+    finally:
+        os.remove(path)
+
+
+def estimate_row_count(path):
+    """
+    Perkiraan jumlah baris data (tanpa membaca seluruh file) untuk indikator progres:
+    CSV dari rata-rata panjang baris pada 1 MB pertama, XLSX dari dimensi semua sheet.
+    """
+    file_extension = path.split('.')[-1].lower()
+
+    if file_extension == 'csv':
+        size = os.path.getsize(path)
+        with open(path, 'rb') as file:
+            sample = file.read(ROW_ESTIMATE_SAMPLE_BYTES)
+        lines = sample.count(b'\n')
+        if lines == 0:
+            return None
+        return max(int(size / (len(sample) / lines)) - 1, 1)
+
+    if file_extension == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            rows = sum(
+                max(workbook[name].max_row - 1, 0)
+                for name in data_sheet_names(workbook.sheetnames, workbook.properties.keywords)
+                if workbook[name].max_row
+            )
+        finally:
+            workbook.close()
+        return rows or None
+
+    return None
+
+
+class ProgressiveAggregation:
+    """
+    Scan file per chunk di background thread. Setelah setiap chunk, agregat
+    berjalan diperbarui sehingga halaman dapat menampilkan hasil sementara
+    (snapshot) selagi parsing berlanjut.
+    """
+
+    def __init__(self, path, chunksize=PROGRESSIVE_CHUNK_SIZE, region_index=None, cleanup=False):
+        self.path = path
+        self.chunksize = chunksize
+        self.region_index = region_index
+        self.cleanup = cleanup
+        self.rows_read = 0
+        self.estimated_rows = None
+        self.error = None
+        self.done = False
+        self._aggregates = None
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.estimated_rows = estimate_row_count(self.path)
+            for chunk in iter_file_chunks(self.path, self.chunksize):
+                partial = aggregate_chunk(chunk, self.region_index)
+                with self._lock:
+                    self._aggregates = merge_aggregates(self._aggregates, partial)
+                    self.rows_read += len(chunk)
+        except Exception as error:
+            self.error = error
+        finally:
+            self.done = True
+            if self.cleanup:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def progress(self):
+        """Perkiraan progres 0..1 (1 hanya setelah seluruh file selesai diproses)"""
+        if self.done:
+            return 1.0
+        if not self.estimated_rows:
+            return 0.0
+        return min(self.rows_read / self.estimated_rows, 0.99)
+
+    def snapshot(self):
+        """Salinan agregat berjalan saat ini dalam bentuk yang sama dengan aggregate_file"""
+        with self._lock:
+            if self._aggregates is None:
+                return pd.DataFrame(columns=['namakecamatan'] + AGGREGATE_COLUMNS)
+            return finalize_aggregates(self._aggregates.copy())
+
+
+def progressive_upload(uploaded_file, chunksize=PROGRESSIVE_CHUNK_SIZE, region_index=None):
+    """Spill file upload ke disk lokal lalu mulai agregasi progresif di background"""
+    path = spill_to_tempfile(uploaded_file)
+    return ProgressiveAggregation(path, chunksize, region_index, cleanup=True).start()
+
+
+def filter_aggregates(aggregates, kecamatan='Semua', tahun='Semua'):
+    """Filter tabel agregat seperti filter DataFrame mentah di halaman visualisasi"""
+    filtered = aggregates
+    if kecamatan != 'Semua':
+        filtered = filtered[filtered['namakecamatan'] == kecamatan]
+    if tahun != 'Semua' and 'tahun' in filtered.columns:
+        filtered = filtered[filtered['tahun'] == tahun]
+    return filtered
+
+
+# Nama kelurahan/desa tidak unik antar kecamatan: tingkat kelurahan selalu
+# dikelompokkan bersama kecamatannya
+KELURAHAN_LEVEL = ['namakecamatan', 'namakelurahan']
+
+
+def region_counts(aggregates, level='namakecamatan'):
+    """
+    Counter berisiko/total per wilayah beserta persentasenya.
+    level: 'namakecamatan' atau KELURAHAN_LEVEL (kecamatan + kelurahan).
+    """
+    counts = aggregates.groupby(level, sort=False, dropna=False, observed=True)[
+        ['total', 'berisiko', 'tidak_berisiko']
+    ].sum()
+    total = counts['total'].to_numpy()
+    counts['persentase'] = np.divide(
+        counts['berisiko'].to_numpy() * 100.0, total,
+        out=np.zeros(len(counts)), where=total > 0
+    )
+    return counts
+
+
+def classify_regions(counts, threshold=WHO_THRESHOLD):
+    """Klasifikasi seluruh wilayah sekaligus: satu perbandingan vektor terhadap threshold"""
+    return np.where(counts['persentase'].to_numpy() > threshold, 'Rentan Stunting', 'Aman')
+
+
+def compare_thresholds(counts, thresholds):
+    """Jumlah wilayah rentan/aman untuk banyak threshold sekaligus (matriks wilayah x threshold)"""
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    rentan = (counts['persentase'].to_numpy()[:, None] > thresholds[None, :]).sum(axis=0)
+    return pd.DataFrame({
+        'threshold': thresholds,
+        'rentan': rentan,
+        'aman': len(counts) - rentan
+    })
+
+
+def kecamatan_stats_from_aggregates(aggregates, threshold=WHO_THRESHOLD):
+    """Membentuk dict statistik per kecamatan (status, persentase, counter) dari agregat"""
+    counts = region_counts(aggregates, 'namakecamatan')
+    status = classify_regions(counts, threshold)
+
+    return {
+        kecamatan: {
+            'status': str(kecamatan_status),
+            'persentase': float(persentase),
+            'berisiko': int(berisiko),
+            'tidak_berisiko': int(tidak_berisiko),
+            'total': int(total)
+        }
+        for kecamatan, kecamatan_status, persentase, berisiko, tidak_berisiko, total in zip(
+            counts.index, status, counts['persentase'], counts['berisiko'],
+            counts['tidak_berisiko'], counts['total']
+        )
+    }
+
+
+def map_points_from_aggregates(aggregates):
+    """
+    Menghitung koordinat rata-rata tiap kecamatan dan titik tengah peta
+    dari jumlah lat/lon yang sudah diakumulasi.
+    """
+    per_kecamatan = aggregates.groupby('namakecamatan', sort=False, observed=True)[
+        ['lat_sum', 'lon_sum', 'coord_count']
+    ].sum()
+    per_kecamatan = per_kecamatan[per_kecamatan['coord_count'] > 0]
+
+    if per_kecamatan.empty:
+        return pd.DataFrame(columns=['namakecamatan', 'lat', 'lon']), None
+
+    map_data = pd.DataFrame({
+        'lat': per_kecamatan['lat_sum'] / per_kecamatan['coord_count'],
+        'lon': per_kecamatan['lon_sum'] / per_kecamatan['coord_count']
+    }).reset_index()
+
+    coord_count = per_kecamatan['coord_count'].sum()
+    center = [
+        per_kecamatan['lat_sum'].sum() / coord_count,
+        per_kecamatan['lon_sum'].sum() / coord_count
+    ]
+    return map_data, center
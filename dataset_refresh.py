@@ -0,0 +1,240 @@
+import hashlib
+import os
+import threading
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+
+# ===============================
+# Normalisasi data penelitian KRS
+# ===============================
+RISK_MAPPING = {
+    '1': 'Berisiko', '0': 'Tidak Berisiko',
+    'true': 'Berisiko', 'false': 'Tidak Berisiko',
+    'ya': 'Berisiko', 'tidak': 'Tidak Berisiko',
+    'yes': 'Berisiko', 'no': 'Tidak Berisiko',
+    'tinggi': 'Berisiko', 'rendah': 'Tidak Berisiko'
+}
+
+DIGEST_BLOCK_SIZE = 1024 * 1024
+TAIL_CHECK_SIZE = 64 * 1024
+# Penanda (properti keywords workbook) untuk XLSX yang dipecah ke beberapa sheet
+SPLIT_SHEET_MARKER = "krs-split-sheets"
+
+
+def normalize_risk_labels(labels):
+    """Mapping berbagai format label risiko_stunting ke Berisiko / Tidak Berisiko"""
+    labels = labels.fillna('Tidak Diketahui').astype(str).str.strip()
+    labels = labels.str.lower().map(RISK_MAPPING).fillna(labels)
+    return labels.str.title()
+
+
+def normalize_dataset(data):
+    """Normalisasi nama kolom dan label risiko_stunting ke format standar"""
+    data.columns = [str(col).lower().replace(' ', '_') for col in data.columns]
+
+    if 'risiko_stunting' in data.columns:
+        data['risiko_stunting'] = normalize_risk_labels(data['risiko_stunting'])
+
+    return data
+
+
+def data_sheet_names(sheet_names, keywords=None):
+    """
+    Sheet yang berisi data. Hanya workbook bertanda SPLIT_SHEET_MARKER (ditulis
+    writers.write_xlsx_streaming saat data melebihi batas baris XLSX) yang dibaca
+    sampai sheet lanjutan Sheet2, Sheet3, ...; workbook lain hanya sheet pertama,
+    sehingga sheet cadangan/per tahun dengan header sama tidak ikut terhitung.
+    """
+    if not sheet_names:
+        return []
+    if SPLIT_SHEET_MARKER not in str(keywords or ''):
+        return [sheet_names[0]]
+
+    names = []
+    for number, name in enumerate(sheet_names, start=1):
+        if name != f"Sheet{number}":
+            break
+        names.append(name)
+    return names or [sheet_names[0]]
+
+
+def read_excel_sheets(source, **kwargs):
+    """
+    Membaca file Excel beserta sheet lanjutannya (lihat data_sheet_names).
+    Sheet lanjutan yang header-nya berbeda dari sheet pertama diabaikan.
+    """
+    if 'sheet_name' in kwargs or not str(getattr(source, 'name', source)).lower().endswith('.xlsx'):
+        return pd.read_excel(source, **kwargs)
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True)
+    try:
+        names = data_sheet_names(workbook.sheetnames, workbook.properties.keywords)
+    finally:
+        workbook.close()
+    if hasattr(source, 'seek'):
+        source.seek(0)
+
+    sheets = list(pd.read_excel(source, sheet_name=names, **kwargs).values())
+    columns = list(sheets[0].columns)
+    parts = [sheet for sheet in sheets if list(sheet.columns) == columns]
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+
+
+def read_dataset(path, normalize_labels=True, **kwargs):
+    """
+    Membaca file data (.xlsx/.xls/.csv/.csv.gz/.parquet) lalu menormalisasinya.
+    normalize_labels=False hanya menormalisasi nama kolom; kolom risiko_stunting
+    dibiarkan mentah (mis. untuk evaluasi yang memetakan label numerik sendiri).
+    """
+    lower = str(path).lower()
+    if lower.endswith('.parquet'):
+        data = pd.read_parquet(path, **kwargs)
+    elif '.csv' in Path(lower).suffixes:
+        data = pd.read_csv(path, **kwargs)
+    else:
+        data = read_excel_sheets(path, **kwargs)
+    if not normalize_labels:
+        data.columns = [str(col).lower().replace(' ', '_') for col in data.columns]
+        return data
+    return normalize_dataset(data)
+
+
+def file_signature(path):
+    """Tanda tangan murah sebuah file: (mtime_ns, ukuran)"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_digest(path, start=0, stop=None):
+    """SHA-1 dari isi file (atau potongan byte [start, stop)) dibaca per blok"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        file.seek(start)
+        remaining = None if stop is None else stop - start
+        while remaining is None or remaining > 0:
+            size = DIGEST_BLOCK_SIZE if remaining is None else min(DIGEST_BLOCK_SIZE, remaining)
+            block = file.read(size)
+            if not block:
+                break
+            digest.update(block)
+            if remaining is not None:
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+class IncrementalRiskCounter:
+    """
+    Counter total / berisiko / tidak berisiko yang diperbarui secara inkremental.
+
+    Setiap pemanggilan refresh() hanya melakukan os.stat. Bila file berubah:
+    - CSV yang hanya ditambah baris di akhir: hanya byte baru yang dibaca
+    - selain itu: isi file dibaca ulang, tetapi counter hanya disesuaikan
+      dengan baris yang bertambah/berkurang (diff multiset hash baris)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.signature = None
+        self.digest = None
+        self.raw_columns = None
+        self.tail_digest = None
+        self.hash_counts = pd.Series(dtype='int64')
+        self.hash_labels = pd.Series(dtype=object)
+        self.counts = {'total': 0, 'high_risk': 0, 'low_risk': 0}
+
+    def statistics(self):
+        """Salinan counter saat ini dalam format statistik dashboard"""
+        return dict(self.counts)
+
+    def refresh(self):
+        """Memperbarui counter bila file berubah. Mengembalikan True jika ada perubahan."""
+        signature = file_signature(self.path)
+        if signature == self.signature:
+            return False
+
+        with self._lock:
+            if signature == self.signature:
+                return False
+
+            if self._is_csv_append(signature[1]):
+                self._apply_rows(self._read_appended_rows(self.signature[1]), replace=False)
+            else:
+                digest = file_digest(self.path)
+                if digest == self.digest:
+                    self.signature = signature
+                    return False
+                self.digest = digest
+                self._apply_rows(self._read_all_rows(), replace=True)
+
+            self.signature = signature
+            self._remember_tail(signature[1])
+            return True
+
+    # ---------- Pembacaan file ---------- #
+
+    def _is_csv_append(self, new_size):
+        if not str(self.path).lower().endswith('.csv') or self.signature is None:
+            return False
+        old_size = self.signature[1]
+        if new_size <= old_size or self.tail_digest is None:
+            return False
+        return file_digest(self.path, max(0, old_size - TAIL_CHECK_SIZE), old_size) == self.tail_digest
+
+    def _remember_tail(self, size):
+        if str(self.path).lower().endswith('.csv'):
+            self.tail_digest = file_digest(self.path, max(0, size - TAIL_CHECK_SIZE), size)
+
+    def _read_all_rows(self):
+        data = read_dataset(self.path)
+        self.raw_columns = None
+        if str(self.path).lower().endswith('.csv'):
+            self.raw_columns = list(pd.read_csv(self.path, nrows=0).columns)
+        return data
+
+    def _read_appended_rows(self, offset):
+        with open(self.path, 'rb') as file:
+            file.seek(offset)
+            appended = file.read()
+        data = pd.read_csv(BytesIO(appended), header=None, names=self.raw_columns)
+        self.digest = None
+        return normalize_dataset(data)
+
+    # ---------- Pembaruan counter ---------- #
+
+    def _apply_rows(self, data, replace):
+        if data.empty:
+            hashes = pd.Series(dtype='uint64')
+            labels = pd.Series(dtype=object)
+        else:
+            hashes = pd.util.hash_pandas_object(data, index=False)
+            if 'risiko_stunting' in data.columns:
+                labels = pd.Series(data['risiko_stunting'].values, index=hashes.values)
+            else:
+                labels = pd.Series(None, index=hashes.values, dtype=object)
+
+        new_counts = hashes.value_counts()
+        labels = labels[~labels.index.duplicated()]
+
+        if replace:
+            delta = new_counts.sub(self.hash_counts, fill_value=0)
+            self.hash_counts = new_counts
+        else:
+            delta = new_counts
+            self.hash_counts = self.hash_counts.add(new_counts, fill_value=0)
+
+        all_labels = pd.concat([self.hash_labels, labels])
+        all_labels = all_labels[~all_labels.index.duplicated(keep='last')]
+
+        # Hanya baris yang berubah yang memengaruhi counter
+        delta = delta[delta != 0]
+        delta_labels = all_labels.reindex(delta.index)
+        self.counts['total'] += int(delta.sum())
+        self.counts['high_risk'] += int(delta[delta_labels == 'Berisiko'].sum())
+        self.counts['low_risk'] += int(delta[delta_labels == 'Tidak Berisiko'].sum())
+
+        self.hash_labels = all_labels.reindex(self.hash_counts.index)
@@ -0,0 +1,193 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_refresh import read_dataset
+from quantization import MODELS, TFLiteModel, load_preprocess, prepare_features, prepare_labels, quantized_model_path
+
+# ===============================
+# Evaluasi batch dan sweep threshold model LSTM
+# ===============================
+REPORT_PATH = "laporan_evaluasi.json"
+SWEEP_DIR = Path("evaluasi")
+DEFAULT_THRESHOLDS = np.round(np.linspace(0.0, 1.0, 401), 4)
+PREDICT_BATCH_SIZE = 8192
+
+
+def load_scoring_model(model_path, backend="keras"):
+    """Model untuk scoring: Keras float32 atau varian TFLite hasil quantization.py"""
+    if backend in ("int8", "float16"):
+        return TFLiteModel(quantized_model_path(model_path, backend))
+    from tensorflow.keras.models import load_model
+    return load_model(model_path)
+
+
+def score_file(data, model, preprocess_data, batch_size=PREDICT_BATCH_SIZE):
+    """Probabilitas Berisiko untuk seluruh baris, dijalankan per batch besar"""
+    inputs = prepare_features(data, preprocess_data)
+    return model.predict(inputs, batch_size=batch_size, verbose=0).reshape(-1).astype(np.float64)
+
+
+def _sorted_cumulative(scores, labels):
+    """
+    Mengurutkan skor sekali (menurun) lalu menghitung TP/FP kumulatif.
+    tp[k] / fp[k] = jumlah positif benar / salah jika k skor tertinggi diprediksi Berisiko.
+    """
+    order = np.argsort(-scores, kind='stable')
+    sorted_scores = scores[order]
+    sorted_labels = labels[order].astype(np.int64)
+    tp = np.concatenate([[0], np.cumsum(sorted_labels)])
+    fp = np.concatenate([[0], np.cumsum(1 - sorted_labels)])
+    return sorted_scores, tp, fp
+
+
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def threshold_sweep(scores, labels, thresholds=DEFAULT_THRESHOLDS):
+    """
+    Confusion matrix, precision/recall/F1, akurasi dan FPR untuk banyak threshold
+    sekaligus. Jumlah prediksi Berisiko per threshold (skor >= threshold) dicari
+    dengan searchsorted pada skor terurut, tanpa loop per threshold.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    sorted_scores, tp_cum, fp_cum = _sorted_cumulative(scores, labels)
+    # searchsorted butuh urutan naik: skor >= t pada urutan menurun = n - (skor < t)
+    ascending = sorted_scores[::-1]
+    predicted_positive = len(scores) - np.searchsorted(ascending, thresholds, side='left')
+
+    positives = tp_cum[-1]
+    negatives = fp_cum[-1]
+    tp = tp_cum[predicted_positive]
+    fp = fp_cum[predicted_positive]
+    fn = positives - tp
+    tn = negatives - fp
+
+    precision = _ratio(tp, tp + fp)
+    recall = _ratio(tp, np.full(len(tp), positives))
+    return pd.DataFrame({
+        'threshold': thresholds,
+        'tp': tp, 'fp': fp, 'tn': tn, 'fn': fn,
+        'precision': precision,
+        'recall': recall,
+        'f1': _ratio(2 * precision * recall, precision + recall),
+        'fpr': _ratio(fp, np.full(len(fp), negatives)),
+        'specificity': _ratio(tn, np.full(len(tn), negatives)),
+        'accuracy': (tp + tn) / max(len(scores), 1),
+    })
+
+
+def curves(scores, labels):
+    """
+    Kurva ROC dan PR penuh (satu titik per skor unik) beserta ROC AUC
+    dan average precision, dari satu pengurutan skor.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    sorted_scores, tp_cum, fp_cum = _sorted_cumulative(scores, np.asarray(labels))
+
+    # Titik potong hanya di akhir setiap kelompok skor yang sama
+    distinct = np.r_[np.flatnonzero(np.diff(sorted_scores)), len(sorted_scores) - 1] + 1
+    tp = np.r_[0, tp_cum[distinct]]
+    fp = np.r_[0, fp_cum[distinct]]
+    positives, negatives = tp_cum[-1], fp_cum[-1]
+
+    tpr = tp / positives if positives else np.zeros(len(tp))
+    fpr = fp / negatives if negatives else np.zeros(len(fp))
+    precision = np.divide(tp, tp + fp, out=np.ones(len(tp)), where=(tp + fp) > 0)
+
+    return {
+        'roc': pd.DataFrame({'threshold': np.r_[np.inf, sorted_scores[distinct - 1]], 'fpr': fpr, 'tpr': tpr}),
+        'pr': pd.DataFrame({'threshold': np.r_[np.inf, sorted_scores[distinct - 1]], 'precision': precision, 'recall': tpr}),
+        'roc_auc': float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2)),
+        'average_precision': float(np.sum(np.diff(tpr) * precision[1:])),
+    }
+
+
+COUNT_COLUMNS = ['tp', 'fp', 'tn', 'fn']
+
+
+def _row_dict(row):
+    return {key: int(value) if key in COUNT_COLUMNS else float(value) for key, value in row.items()}
+
+
+def _best_rows(sweep):
+    """Threshold terbaik menurut F1 dan Youden's J, serta metrik pada threshold 0.5"""
+    return {
+        'threshold_0_5': _row_dict(sweep.iloc[(sweep['threshold'] - 0.5).abs().argmin()]),
+        'best_f1': _row_dict(sweep.loc[sweep['f1'].idxmax()]),
+        'best_youden': _row_dict(sweep.loc[(sweep['recall'] - sweep['fpr']).idxmax()]),
+    }
+
+
+def evaluate_all(data_path, backend="keras", thresholds=DEFAULT_THRESHOLDS, output_dir=SWEEP_DIR):
+    """
+    Scoring file berlabel dengan kedua model, lalu sweep threshold dan kurva ROC/PR.
+    Baris dengan label di luar Berisiko/Tidak Berisiko (atau kosong) tidak ikut
+    dievaluasi; jumlahnya dilaporkan sebagai labels_dropped.
+    Tabel sweep dan kurva disimpan sebagai CSV di output_dir; ringkasan dikembalikan.
+    """
+    # Label dibaca mentah agar label numerik (1.0 / 0.0) dipetakan oleh prepare_labels
+    data = read_dataset(data_path, normalize_labels=False)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    report = {'data': str(data_path), 'rows': len(data), 'backend': backend, 'models': {}}
+    for name, (model_path, pkl_path) in MODELS.items():
+        preprocess_data = load_preprocess(pkl_path)
+        prepared = prepare_labels(data, preprocess_data)
+        if prepared is None:
+            raise ValueError(f"Kolom target '{preprocess_data.get('target_column', 'risiko_stunting')}' tidak ditemukan")
+        labels, known = prepared
+        if not known.any():
+            raise ValueError("Tidak ada baris dengan label Berisiko/Tidak Berisiko untuk dievaluasi")
+        labels = labels[known]
+
+        model = load_scoring_model(model_path, backend)
+        start = time.perf_counter()
+        scores = score_file(data[known], model, preprocess_data)
+        scoring_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sweep = threshold_sweep(scores, labels, thresholds)
+        model_curves = curves(scores, labels)
+        sweep_seconds = time.perf_counter() - start
+
+        sweep.to_csv(output_dir / f"sweep_{name}.csv", index=False)
+        model_curves['roc'].to_csv(output_dir / f"roc_{name}.csv", index=False)
+        model_curves['pr'].to_csv(output_dir / f"pr_{name}.csv", index=False)
+
+        report['models'][name] = {
+            'scoring_seconds': scoring_seconds,
+            'sweep_seconds': sweep_seconds,
+            'labels_dropped': int((~known).sum()),
+            'positives': int(labels.sum()),
+            'roc_auc': model_curves['roc_auc'],
+            'average_precision': model_curves['average_precision'],
+            **_best_rows(sweep),
+        }
+
+    return report
+
+
+if __name__ == "__main__":
+    # Contoh: python evaluation.py data_krs_2025.xlsx --backend keras --steps 401
+    parser = argparse.ArgumentParser(description="Evaluasi batch dan sweep threshold model LSTM risiko stunting")
+    parser.add_argument("data", help="File data berlabel (.xlsx/.csv/.parquet) dengan kolom fitur KRS")
+    parser.add_argument("--backend", choices=["keras", "int8", "float16"], default="keras")
+    parser.add_argument("--steps", type=int, default=len(DEFAULT_THRESHOLDS), help="Jumlah threshold di [0, 1]")
+    parser.add_argument("--output", default=REPORT_PATH, help="File ringkasan evaluasi (JSON)")
+    parser.add_argument("--sweep-dir", default=str(SWEEP_DIR), help="Direktori CSV sweep dan kurva ROC/PR")
+    args = parser.parse_args()
+
+    result = evaluate_all(args.data, args.backend, np.linspace(0.0, 1.0, args.steps), args.sweep_dir)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,162 @@
+import base64
+from pathlib import Path
+
+import folium
+import pandas as pd
+import plotly.express as px
+from folium.features import CustomIcon
+
+from aggregation import WHO_THRESHOLD
+
+# ===============================
+# Peta folium dan diagram dashboard (dipakai halaman Streamlit dan ekspor statis)
+# ===============================
+
+def get_icon_path(status):
+    """Get path untuk custom marker icon"""
+    if status == 'Aman':
+        return 'assets/marker_green.png'
+    else:
+        return 'assets/marker_red.png'
+
+
+def inline_icon(icon_path):
+    """Icon PNG sebagai data URL base64, agar HTML tidak bergantung pada file assets"""
+    encoded = base64.b64encode(Path(icon_path).read_bytes()).decode('ascii')
+    return f"data:image/png;base64,{encoded}"
+
+
+def base_map(center):
+    """Peta dasar tanpa marker; tetap sama antar rerun sehingga komponen peta tidak dimuat ulang"""
+    return folium.Map(
+        location=center,
+        zoom_start=12,
+        prefer_canvas=True
+    )
+
+
+def build_markers(map_data, kecamatan_stats, threshold=WHO_THRESHOLD, inline_icons=False):
+    """
+    Layer marker kecamatan dengan custom icon sesuai status pada threshold terpilih.
+    inline_icons=True menyematkan icon sebagai base64 (untuk HTML statis).
+    """
+    markers = folium.FeatureGroup(name="Kecamatan")
+
+    for _, row in map_data.iterrows():
+        kec_name = row['namakecamatan']
+        stats = kecamatan_stats.get(kec_name)
+        if stats is None:
+            continue
+
+        is_aman = stats['status'] == 'Aman'
+        status_emoji = "✅" if is_aman else "⚠️"
+        status_color = "#51cf66" if is_aman else "#ff6b6b"
+
+        popup_html = f"""
+        <div style="font-size: 14px; font-family: 'Poppins', sans-serif; min-width: 250px;">
+            <b style="color: #667eea;">📍 Kecamatan:</b> {kec_name}<br>
+            <b style="color: {status_color};">{status_emoji} Status:</b> <b>{stats['status']}</b><br>
+            <b style="color: #ff6b6b;">📊 Persentase Berisiko:</b> <b>{stats['persentase']:.1f}%</b><br><br>
+            <b style="color: #667eea;">📈 Distribusi Data:</b><br>
+            ✅ Tidak Berisiko: <b>{stats['tidak_berisiko']}</b> ({stats['tidak_berisiko']/stats['total']*100:.1f}%)<br>
+            ⚠️ Berisiko: <b>{stats['berisiko']}</b> ({stats['berisiko']/stats['total']*100:.1f}%)<br>
+            <b style="color: #764ba2;">📊 Total Data: {stats['total']}</b><br><br>
+            <i style="color: #999; font-size: 11px;">
+            * Threshold: >{threshold:g}% Berisiko = Rentan Stunting<br>
+            * ≤{threshold:g}% Berisiko = Aman
+            </i>
+        </div>
+        """
+
+        # Gunakan custom icon
+        icon_path = get_icon_path(stats['status'])
+
+        # Cek apakah file icon ada
+        if Path(icon_path).exists():
+            custom_icon = CustomIcon(
+                inline_icon(icon_path) if inline_icons else icon_path,
+                icon_size=(40, 40),
+                icon_anchor=(20, 40),
+                popup_anchor=(0, -40)
+            )
+
+            folium.Marker(
+                location=[row['lat'], row['lon']],
+                icon=custom_icon,
+                popup=folium.Popup(popup_html, max_width=400)
+            ).add_to(markers)
+        else:
+            # Fallback ke icon default jika file tidak ditemukan
+            color = 'green' if is_aman else 'red'
+            folium.Marker(
+                location=[row['lat'], row['lon']],
+                icon=folium.Icon(color=color, icon='info-sign'),
+                popup=folium.Popup(popup_html, max_width=400)
+            ).add_to(markers)
+
+    return markers
+
+
+def build_map(map_data, center, kecamatan_stats, threshold=WHO_THRESHOLD, inline_icons=False):
+    """Membangun peta folium lengkap (peta dasar + marker) dari koordinat per kecamatan"""
+    if map_data.empty or center is None:
+        return None
+
+    m = base_map(center)
+    build_markers(map_data, kecamatan_stats, threshold, inline_icons).add_to(m)
+    return m
+
+
+def risk_bar_figure(stats):
+    """Diagram batang distribusi risiko stunting dari statistik {'total', 'high_risk', 'low_risk'}"""
+    # Hitung persentase yang benar
+    total = stats['total']
+    if total > 0:
+        persen_tidak_berisiko = (stats['low_risk'] / total) * 100
+        persen_berisiko = (stats['high_risk'] / total) * 100
+    else:
+        persen_tidak_berisiko = 0
+        persen_berisiko = 0
+
+    # Persiapkan data untuk chart
+    chart_data = pd.DataFrame({
+        'Kategori': ['Tidak Berisiko', 'Berisiko'],
+        'Jumlah': [stats['low_risk'], stats['high_risk']],
+        'Persentase': [persen_tidak_berisiko, persen_berisiko]
+    })
+
+    # Buat bar chart dengan Plotly
+    fig = px.bar(
+        chart_data,
+        x='Kategori',
+        y='Jumlah',
+        color='Kategori',
+        color_discrete_map={
+            'Tidak Berisiko': '#28a745',
+            'Berisiko': '#dc3545'
+        },
+        title='',
+        custom_data=['Persentase']
+    )
+
+    # Kustomisasi chart dengan format persentase yang lebih jelas
+    fig.update_traces(
+        texttemplate='%{y:,}<br>(%{customdata[0]:.1f}%)',
+        textposition='outside',
+        textfont=dict(size=14, color='black')
+    )
+
+    fig.update_layout(
+        showlegend=False,
+        xaxis_title="Kategori Risiko",
+        yaxis_title="Jumlah Keluarga",
+        font=dict(size=12),
+        height=500,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        margin=dict(t=50, b=50, l=50, r=50)
+    )
+
+    fig.update_xaxes(showgrid=False)
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='lightgray')
+    return fig
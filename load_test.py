@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from prediction_store import STORE_PATH_ENV
+
+# ===============================
+# Load test sesi Streamlit bersamaan (AppTest, tanpa server/layanan eksternal)
+# ===============================
+# Setiap sesi simulasi adalah satu AppTest; semua sesi berjalan di proses yang
+# sama sehingga st.cache_data / st.cache_resource dibagi seperti pada satu
+# instance dashboard, dan setiap rerun berjalan di thread-nya sendiri.
+PAGES = {
+    'home': 'Home.py',
+    'visualisasi': 'pages/visualisasi.py',
+    'klasifikasi': 'pages/Klasifikasi.py',
+}
+DEFAULT_CONCURRENCY = [1, 2, 4, 8]
+PERCENTILES = [50, 90, 95, 99]
+SCRIPT_TIMEOUT = 300
+# Penanda di session_state bahwa skrip dihentikan dengan st.stop()
+STOPPED_FLAG = '_load_test_stopped'
+
+
+def current_rss_mb():
+    """RSS proses saat ini (MB) dari /proc; fallback ke puncak RSS dari resource"""
+    try:
+        with open('/proc/self/status', encoding='utf-8') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Puncak RSS proses (ru_maxrss dalam KB di Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemorySampler(threading.Thread):
+    """Mencatat RSS secara berkala selama satu tingkat konkurensi berjalan"""
+
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(current_rss_mb())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return max(self.samples, default=current_rss_mb())
+
+
+def install_upload(data_path):
+    """
+    Mengganti st.file_uploader agar mengembalikan file data nyata
+    (UploadedFile), sehingga halaman visualisasi memproses upload seperti biasa.
+    """
+    import streamlit as st
+    from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+
+    content = Path(data_path).read_bytes()
+    name = Path(data_path).name
+
+    def file_uploader(*args, **kwargs):
+        return UploadedFile(UploadedFileRec(name, name, 'application/octet-stream', content), None)
+
+    st.file_uploader = file_uploader
+
+
+def install_stop_marker():
+    """
+    Membungkus st.stop agar setiap pemanggilan ditandai di session_state sesi
+    tersebut; rerun yang berhenti lewat st.stop dihitung sebagai gagal.
+    """
+    import streamlit as st
+
+    original_stop = st.stop
+
+    def stop():
+        st.session_state[STOPPED_FLAG] = True
+        original_stop()
+
+    st.stop = stop
+
+
+def _failed(app):
+    """Rerun gagal jika ada exception, pesan st.error, atau dihentikan st.stop"""
+    stopped = STOPPED_FLAG in app.session_state and app.session_state[STOPPED_FLAG]
+    return bool(app.exception) or bool(app.error) or bool(stopped)
+
+
+def _timed_run(app, records, page, action):
+    if STOPPED_FLAG in app.session_state:
+        app.session_state[STOPPED_FLAG] = False
+    start = time.perf_counter()
+    app.run(timeout=SCRIPT_TIMEOUT)
+    records.append({
+        'page': page,
+        'action': action,
+        'latency': time.perf_counter() - start,
+        'error': _failed(app),
+    })
+
+
+# ---------- Skenario per halaman ---------- #
+
+def scenario_home(app, records, rng, rounds):
+    _timed_run(app, records, 'home', 'buka')
+    for _ in range(rounds):
+        _timed_run(app, records, 'home', 'rerun')
+
+
+def scenario_visualisasi(app, records, rng, rounds):
+    """Upload file, lalu ganti filter kecamatan/tahun dan threshold"""
+    _timed_run(app, records, 'visualisasi', 'upload')
+    if _failed(app) or not app.selectbox:
+        return
+
+    for _ in range(rounds):
+        kecamatan = app.selectbox[0]
+        kecamatan.set_value(rng.choice(list(kecamatan.options)))
+        _timed_run(app, records, 'visualisasi', 'filter_kecamatan')
+
+        if len(app.selectbox) > 1:
+            tahun = app.selectbox[1]
+            tahun.set_value(rng.choice(list(tahun.options)))
+            _timed_run(app, records, 'visualisasi', 'filter_tahun')
+
+        if app.slider:
+            app.slider[0].set_value(rng.randint(10, 40))
+            _timed_run(app, records, 'visualisasi', 'threshold')
+
+
+def scenario_klasifikasi(app, records, rng, rounds):
+    """Mengisi form risiko keluarga secara acak lalu submit"""
+    _timed_run(app, records, 'klasifikasi', 'buka')
+    if _failed(app) or not app.button:
+        return
+
+    for _ in range(rounds):
+        for radio in app.radio:
+            radio.set_value(rng.choice(list(radio.options)))
+        app.button[0].click()
+        _timed_run(app, records, 'klasifikasi', 'submit')
+
+
+SCENARIOS = {
+    'home': scenario_home,
+    'visualisasi': scenario_visualisasi,
+    'klasifikasi': scenario_klasifikasi,
+}
+
+
+def run_session(page, records, seed, rounds):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(str(Path(PAGES[page]).resolve()), default_timeout=SCRIPT_TIMEOUT)
+    SCENARIOS[page](app, records, random.Random(seed), rounds)
+
+
+def run_level(pages, concurrency, rounds, seed=0):
+    """
+    Menjalankan `concurrency` sesi bersamaan per halaman (dibagi rata antar halaman)
+    dan mengembalikan (catatan latensi, puncak RSS MB).
+    """
+    records = []
+    sampler = MemorySampler()
+    sampler.start()
+
+    threads = []
+    for index in range(concurrency):
+        page = pages[index % len(pages)]
+        thread = threading.Thread(target=run_session, args=(page, records, seed + index, rounds))
+        threads.append(thread)
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return records, sampler.stop()
+
+
+def summarize(records, concurrency, peak_mb):
+    """Persentil latensi rerun per halaman untuk satu tingkat konkurensi"""
+    if not records:
+        return pd.DataFrame()
+
+    frame = pd.DataFrame(records)
+    rows = []
+    for page, group in frame.groupby('page'):
+        latencies = group['latency'].to_numpy() * 1000
+        row = {'konkurensi': concurrency, 'halaman': page, 'rerun': len(group), 'error': int(group['error'].sum())}
+        row.update({f'p{p}_ms': round(float(np.percentile(latencies, p)), 1) for p in PERCENTILES})
+        row['puncak_rss_mb'] = round(peak_mb, 1)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def load_test(pages, levels=DEFAULT_CONCURRENCY, rounds=3, data_path=None):
+    if data_path:
+        install_upload(data_path)
+    install_stop_marker()
+
+    # Skor sintetis halaman Klasifikasi ditulis ke store sementara, bukan riwayat asli
+    previous_store = os.environ.get(STORE_PATH_ENV)
+    with tempfile.TemporaryDirectory(prefix="krs_load_test_") as temp_dir:
+        os.environ[STORE_PATH_ENV] = os.path.join(temp_dir, "prediksi_load_test.sqlite")
+        try:
+            # Pemanasan: cache model/data terisi sebelum pengukuran
+            for page in pages:
+                run_session(page, [], seed=0, rounds=0)
+
+            results = []
+            for concurrency in levels:
+                records, peak_mb = run_level(pages, concurrency, rounds)
+                results.append(summarize(records, concurrency, peak_mb))
+        finally:
+            if previous_store is None:
+                os.environ.pop(STORE_PATH_ENV, None)
+            else:
+                os.environ[STORE_PATH_ENV] = previous_store
+    return pd.concat(results, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # Contoh: python load_test.py --data penelitian_bersih.xlsx --concurrency 1 4 16 --rounds 3
+    parser = argparse.ArgumentParser(description="Load test sesi Streamlit bersamaan")
+    parser.add_argument("--pages", nargs="+", choices=list(PAGES), default=list(PAGES))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rounds", type=int, default=3, help="Jumlah putaran aksi per sesi")
+    parser.add_argument("--data", help="File data yang di-upload pada halaman visualisasi")
+    parser.add_argument("--output", help="Simpan hasil ke file JSON")
+    args = parser.parse_args()
+
+    if 'visualisasi' in args.pages and not args.data:
+        parser.error("--data wajib diisi untuk halaman visualisasi")
+
+    report = load_test(args.pages, args.concurrency, args.rounds, args.data)
+    print(report.to_string(index=False))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report.to_dict(orient='records'), file, indent=2)
@@ -0,0 +1,251 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# Mode shared-memory (memory-mapped, read-only)
+# ===============================
+# Semua worker Streamlit yang memakai direktori yang sama memetakan
+# halaman fisik yang sama dari page cache OS, sehingga replika tambahan
+# tidak menyalin ulang dataset maupun bobot model.
+SHARED_DIR_ENV = "KRS_SHARED_DIR"
+MANIFEST_NAME = "manifest.json"
+
+
+def shared_dir():
+    """Direktori shared-memory dari environment (None jika mode ini tidak aktif)"""
+    path = os.environ.get(SHARED_DIR_ENV)
+    return Path(path) if path else None
+
+
+def _publish(build, target):
+    """
+    Menulis artefak ke direktori sementara lalu me-rename secara atomik,
+    sehingga beberapa proses yang mengekspor bersamaan tidak saling menimpa.
+    """
+    target = Path(target)
+    if (target / MANIFEST_NAME).exists():
+        return target
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=target.parent, prefix=f".{target.name}-"))
+    try:
+        build(staging)
+        os.rename(staging, target)
+    except OSError:
+        # Proses lain sudah lebih dulu mempublikasikan artefak yang sama
+        if not (target / MANIFEST_NAME).exists():
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def _json_safe(value):
+    if hasattr(value, 'item'):
+        value = value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+# ---------- Dataset ---------- #
+
+def export_dataframe(df, target):
+    """
+    Menyimpan DataFrame sebagai satu file .npy per kolom.
+    Kolom numerik/bool/datetime disimpan apa adanya; kolom teks
+    disimpan sebagai kode integer + daftar kategori di manifest.
+    """
+    def build(staging):
+        columns = []
+        for position, column in enumerate(df.columns):
+            series = df[column]
+            file_name = f"col_{position}.npy"
+            if (pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)
+                    or pd.api.types.is_datetime64_dtype(series)) and not isinstance(series.dtype, pd.CategoricalDtype):
+                np.save(staging / file_name, series.to_numpy())
+                columns.append({'name': str(column), 'file': file_name, 'kind': 'array'})
+            else:
+                codes, categories = pd.factorize(series, use_na_sentinel=True)
+                dtype = np.int16 if len(categories) < np.iinfo(np.int16).max else np.int32
+                np.save(staging / file_name, codes.astype(dtype))
+                columns.append({
+                    'name': str(column), 'file': file_name, 'kind': 'category',
+                    'categories': [_json_safe(value) for value in categories]
+                })
+
+        with open(staging / MANIFEST_NAME, 'w', encoding='utf-8') as file:
+            json.dump({'rows': len(df), 'columns': columns}, file, ensure_ascii=False)
+
+    return _publish(build, target)
+
+
+def load_dataframe(source):
+    """
+    Membuka DataFrame hasil export_dataframe dengan np.load(mmap_mode='r').
+    Kolom numerik dipakai langsung dari halaman memory-mapped; hanya kode
+    kategori kolom teks (1-2 byte per baris) yang disalin ke tiap proses.
+    """
+    source = Path(source)
+    with open(source / MANIFEST_NAME, encoding='utf-8') as file:
+        manifest = json.load(file)
+
+    data = {}
+    for column in manifest['columns']:
+        values = np.load(source / column['file'], mmap_mode='r')
+        if column['kind'] == 'category':
+            data[column['name']] = pd.Categorical.from_codes(values, categories=column['categories'])
+        else:
+            data[column['name']] = values
+
+    return pd.DataFrame(data, copy=False)
+
+
+def shared_dataset_path(key):
+    """Lokasi dataset bersama untuk sebuah kunci (misal hash isi file upload)"""
+    return shared_dir() / 'datasets' / key
+
+
+# ---------- Model ---------- #
+
+def export_keras_model(model, target):
+    """
+    Mengekspor model Keras Sequential (LSTM/BatchNormalization/Dropout/Dense)
+    menjadi bobot .npy per layer + manifest arsitektur.
+    """
+    def build(staging):
+        layers = []
+        for position, layer in enumerate(model.layers):
+            weights = []
+            for index, weight in enumerate(layer.get_weights()):
+                file_name = f"layer_{position}_{index}.npy"
+                np.save(staging / file_name, np.asarray(weight, dtype=np.float32))
+                weights.append(file_name)
+
+            config = layer.get_config()
+            layers.append({
+                'type': layer.__class__.__name__,
+                'weights': weights,
+                'config': {key: _json_safe(config.get(key)) for key in
+                           ['units', 'activation', 'recurrent_activation', 'return_sequences',
+                            'epsilon', 'center', 'scale']}
+            })
+
+        with open(staging / MANIFEST_NAME, 'w', encoding='utf-8') as file:
+            json.dump({'layers': layers}, file)
+
+    return _publish(build, target)
+
+
+ACTIVATIONS = {
+    None: lambda x: x,
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: np.exp(-np.logaddexp(0, -x)),
+    'tanh': np.tanh,
+}
+
+
+class MemmapSequentialModel:
+    """
+    Inferensi NumPy untuk model LSTM bertumpuk dengan bobot memory-mapped.
+    Antarmuka predict() sama dengan Keras sehingga dapat menggantikan model
+    hasil load_model pada halaman Klasifikasi tanpa memuat TensorFlow.
+    """
+
+    def __init__(self, source):
+        source = Path(source)
+        with open(source / MANIFEST_NAME, encoding='utf-8') as file:
+            manifest = json.load(file)
+
+        self.layers = []
+        for layer in manifest['layers']:
+            weights = [np.load(source / name, mmap_mode='r') for name in layer['weights']]
+            self.layers.append((layer['type'], layer['config'], weights))
+
+    @staticmethod
+    def _lstm(x, config, weights):
+        kernel, recurrent_kernel, bias = weights
+        units = config['units']
+        activation = ACTIVATIONS[config.get('activation') or 'tanh']
+        recurrent_activation = ACTIVATIONS[config.get('recurrent_activation') or 'sigmoid']
+
+        h = np.zeros((x.shape[0], units), dtype=np.float32)
+        c = np.zeros((x.shape[0], units), dtype=np.float32)
+        outputs = []
+        for step in range(x.shape[1]):
+            z = x[:, step, :] @ kernel + h @ recurrent_kernel + bias
+            # Urutan gate Keras: input, forget, cell, output
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            outputs.append(h)
+
+        return np.stack(outputs, axis=1) if config.get('return_sequences') else h
+
+    @staticmethod
+    def _batch_norm(x, config, weights):
+        weights = list(weights)
+        gamma = weights.pop(0) if config.get('scale', True) else 1.0
+        beta = weights.pop(0) if config.get('center', True) else 0.0
+        moving_mean, moving_variance = weights
+        epsilon = config.get('epsilon') or 1e-3
+        return gamma * (x - moving_mean) / np.sqrt(moving_variance + epsilon) + beta
+
+    @staticmethod
+    def _dense(x, config, weights):
+        kernel, bias = weights
+        return ACTIVATIONS[config.get('activation')](x @ kernel + bias)
+
+    def predict(self, x, batch_size=4096, verbose=0):
+        """Prediksi probabilitas untuk input (batch, time_steps, fitur)"""
+        x = np.asarray(x, dtype=np.float32)
+        results = []
+        for start in range(0, len(x), batch_size):
+            output = x[start:start + batch_size]
+            for layer_type, config, weights in self.layers:
+                if layer_type == 'LSTM':
+                    output = self._lstm(output, config, weights)
+                elif layer_type == 'BatchNormalization':
+                    output = self._batch_norm(output, config, weights)
+                elif layer_type == 'Dense':
+                    output = self._dense(output, config, weights)
+                elif layer_type in ('Dropout', 'InputLayer'):
+                    continue
+                else:
+                    raise ValueError(f"Layer {layer_type} tidak didukung oleh mode memory-mapped")
+            results.append(output)
+        return np.concatenate(results, axis=0) if results else np.empty((0, 1), dtype=np.float32)
+
+
+def shared_model_path(model_path):
+    """Lokasi bobot model bersama untuk file .h5 tertentu"""
+    return shared_dir() / 'models' / Path(model_path).stem
+
+
+if __name__ == "__main__":
+    # Contoh:
+    #   KRS_SHARED_DIR=/dev/shm/krs python mmap_store.py model model_lstm_2layer_risiko_stunting.h5
+    #   KRS_SHARED_DIR=/dev/shm/krs python mmap_store.py data penelitian_bersih.xlsx
+    if len(sys.argv) < 3 or shared_dir() is None:
+        print(f"Penggunaan: {SHARED_DIR_ENV}=<direktori> python mmap_store.py (model|data) <file>")
+        sys.exit(1)
+
+    kind, path = sys.argv[1], sys.argv[2]
+    if kind == 'model':
+        from tensorflow.keras.models import load_model
+        target = export_keras_model(load_model(path), shared_model_path(path))
+    else:
+        from dataset_refresh import read_dataset
+        target = export_dataframe(read_dataset(path), shared_dataset_path(Path(path).stem))
+    print(f"Artefak shared-memory disimpan ke {target}")
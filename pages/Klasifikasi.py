@@ -1,8 +1,22 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
+import os
 import pickle
-from tensorflow.keras.models import load_model
+from datetime import datetime
+
+from mmap_store import MemmapSequentialModel, shared_dir, shared_model_path
+from prediction_store import PredictionStore, model_version
+from quantization import TFLiteModel, quantized_model_path
+from validation import CANONICAL_KECAMATAN
+
+# Backend model:
+# - "keras" (default): model float32 .h5
+# - "mmap": bobot memory-mapped di KRS_SHARED_DIR, dibagi antar worker Streamlit tanpa memuat TensorFlow
+# - "int8" / "float16": model TFLite hasil quantization.py
+MODEL_BACKEND = os.environ.get("KRS_MODEL_BACKEND", "keras")
+MODEL_PATH = "model_lstm_2layer_risiko_stunting.h5"
+NOT_FILLED = "(tidak diisi)"
 
 # ==============================
 # KONFIGURASI HALAMAN
@@ -77,7 +91,13 @@ def load_ml_components():
     berada di folder yang sama dengan app.py
     """
     try:
-        model = load_model("model_lstm_2layer_risiko_stunting.h5")
+        if MODEL_BACKEND == "mmap" and shared_dir() is not None:
+            model = MemmapSequentialModel(shared_model_path(MODEL_PATH))
+        elif MODEL_BACKEND in ("int8", "float16"):
+            model = TFLiteModel(quantized_model_path(MODEL_PATH, MODEL_BACKEND))
+        else:
+            from tensorflow.keras.models import load_model
+            model = load_model(MODEL_PATH)
         with open("preprocess_lstm_2layer_risiko_stunting.pkl", "rb") as file:
             preprocess_data = pickle.load(file)
             scaler = preprocess_data["scaler"]
@@ -86,6 +106,20 @@ def load_ml_components():
         st.error(f"Gagal memuat model atau scaler: {str(e)}")
         return None, None
 
+@st.cache_resource
+def get_prediction_store():
+    """Koneksi SQLite bersama untuk riwayat skor (dibagi antar sesi)"""
+    return PredictionStore()
+
+
+@st.cache_resource
+def get_model_version():
+    """Versi model aktif (backend + hash file bobot) sebagai kunci deduplikasi skor"""
+    if MODEL_BACKEND in ("int8", "float16"):
+        return model_version(quantized_model_path(MODEL_PATH, MODEL_BACKEND), MODEL_BACKEND)
+    return model_version(MODEL_PATH, MODEL_BACKEND)
+
+
 model, scaler = load_ml_components()
 
 # Hanya tampilkan form jika model berhasil dimuat
@@ -195,6 +229,22 @@ if model is not None and scaler is not None:
                 ]
             )
 
+        # Wilayah dan tahun (opsional) untuk riwayat skor
+        col3, col4, col5 = st.columns(3)
+        with col3:
+            kecamatan = st.selectbox("Kecamatan (opsional)", [NOT_FILLED] + CANONICAL_KECAMATAN)
+        with col4:
+            kelurahan = st.text_input("Kelurahan/Desa (opsional)")
+        with col5:
+            tahun = st.selectbox(
+                "Tahun (opsional)",
+                [NOT_FILLED] + list(range(datetime.now().year, 2019, -1))
+            )
+        household_id = st.text_input(
+            "ID Keluarga / No. KK (opsional)",
+            help="Jika diisi, skor ulang keluarga yang sama memperbarui riwayatnya, bukan menambah baris baru"
+        )
+
         # Submit Button
         st.markdown("---")
         submit_analysis = st.form_submit_button(
@@ -249,18 +299,31 @@ if model is not None and scaler is not None:
         # Konversi ke DataFrame
         input_df = pd.DataFrame([family_data])
 
-        # Scaling data
+        # Wilayah/tahun/ID keluarga bila diisi, disimpan bersama skor
+        region_df = pd.DataFrame([{
+            "namakecamatan": None if kecamatan == NOT_FILLED else kecamatan,
+            "namakelurahan": kelurahan.strip().upper() or None,
+            "tahun": None if tahun == NOT_FILLED else tahun,
+            "household_id": household_id.strip() or None,
+        }])
+
+        def predict_scores(features):
+            # Bentuk input untuk LSTM: (batch_size, time_steps, features)
+            scaled_data = scaler.transform(features)
+            lstm_input = scaled_data.reshape((len(features), 1, features.shape[1]))
+            return model.predict(lstm_input).reshape(-1)
+
+        # Scaling + prediksi; vektor fitur yang sudah pernah diskor diambil dari riwayat
         try:
-            scaled_data = scaler.transform(input_df)
+            with st.spinner("Sedang menganalisis risiko keluarga..."):
+                scores, cached_count = get_prediction_store().score(
+                    predict_scores, input_df, get_model_version(), region_df
+                )
         except Exception as e:
-            st.error(f"Terjadi kesalahan saat scaling data: {str(e)}")
+            st.error(f"Terjadi kesalahan saat memproses data: {str(e)}")
             st.stop()
 
-        # Bentuk input untuk LSTM: (batch_size, time_steps, features)
-        lstm_input = scaled_data.reshape((1, 1, input_df.shape[1]))
-
-        with st.spinner("Sedang menganalisis risiko keluarga..."):
-            prediction_result = model.predict(lstm_input)[0][0]
+        prediction_result = scores[0]
 
         st.markdown("---")
         st.markdown("## Hasil Analisis")
@@ -281,10 +344,24 @@ if model is not None and scaler is not None:
             </div>
             """, unsafe_allow_html=True)
 
+        if cached_count:
+            st.caption("Hasil diambil dari riwayat skor (vektor fitur yang sama sudah pernah dianalisis).")
+
         # Tampilkan ringkasan input
         with st.expander("Lihat Ringkasan Data yang Dimasukkan"):
             st.write(input_df)
 
+    # ==============================
+    # RIWAYAT SKOR
+    # ==============================
+    with st.expander("Riwayat Skor per Kecamatan"):
+        history = get_prediction_store().aggregate('namakecamatan', version=get_model_version())
+        if history.empty:
+            st.info("Belum ada skor yang tersimpan.")
+        else:
+            history['namakecamatan'] = history['namakecamatan'].fillna(NOT_FILLED)
+            st.dataframe(history, use_container_width=True, hide_index=True)
+
 # ==============================
 # FOOTER
 # ==============================
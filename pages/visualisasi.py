@@ -1,10 +1,34 @@
 import streamlit as st
 import pandas as pd
-import folium
 from streamlit_folium import st_folium
-from folium.features import CustomIcon
 import base64
-from pathlib import Path
+import hashlib
+
+from aggregation import (
+    WHO_THRESHOLD,
+    KELURAHAN_LEVEL,
+    normalize_risk_column,
+    aggregate_upload,
+    progressive_upload,
+    aggregate_dataframe,
+    filter_aggregates,
+    region_counts,
+    classify_regions,
+    compare_thresholds,
+    kecamatan_stats_from_aggregates,
+    map_points_from_aggregates,
+)
+from spatial_index import (
+    KECAMATAN_BOUNDARY_PATH, KELURAHAN_BOUNDARY_PATH, assign_kelurahan, build_kelurahan_index, build_region_index,
+    validate_region_column, robust_centroids
+)
+from dataset_refresh import read_excel_sheets
+from mmap_store import shared_dir, shared_dataset_path, export_dataframe, load_dataframe
+from reports import ReportManager, dataset_hash
+from figures import base_map, build_markers
+
+# File di atas ukuran ini otomatis diproses dengan mode out-of-core
+OUT_OF_CORE_THRESHOLD_MB = 100
 
 # ========== Konfigurasi Awal ========== #
 st.set_page_config(page_title="Visualisasi Risiko Stunting", layout="wide", initial_sidebar_state="expanded")
@@ -84,27 +108,48 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# ================= HELPER FUNCTIONS ================= #
+# ================= CACHED FUNCTIONS ================= #
 
-def get_icon_path(status):
-    """Get path untuk custom marker icon"""
-    if status == 'Aman':
-        return 'assets/marker_green.png'
-    else:
-        return 'assets/marker_red.png'
+@st.cache_resource(show_spinner=False)
+def get_region_index():
+    """Indeks grid batas kecamatan (None jika file GeoJSON batas wilayah tidak tersedia)"""
+    return build_region_index()
 
-# ================= CACHED FUNCTIONS ================= #
+@st.cache_resource(show_spinner=False)
+def get_kelurahan_index():
+    """Indeks grid batas kelurahan/desa (None jika file GeoJSON batas kelurahan tidak tersedia)"""
+    return build_kelurahan_index()
 
 @st.cache_data
 def load_data_from_upload(uploaded_file):
     """Load data dari file yang diupload dengan caching"""
+    return read_upload_file(uploaded_file)
+
+@st.cache_resource(show_spinner=False)
+def load_shared_data_from_upload(file_key, _uploaded_file):
+    """
+    Mode shared-memory: DataFrame hasil normalisasi disimpan sebagai kolom
+    memory-mapped di KRS_SHARED_DIR (kunci = hash isi file). Semua worker
+    yang menerima file yang sama memetakan halaman fisik yang sama (read-only).
+    """
+    digest = hashlib.sha1(_uploaded_file.getvalue()).hexdigest()
+    target = shared_dataset_path(digest)
+    if not target.exists():
+        df = read_upload_file(_uploaded_file)
+        if df.empty:
+            return df
+        export_dataframe(df, target)
+    return load_dataframe(target)
+
+def read_upload_file(uploaded_file):
+    """Membaca dan menormalisasi file yang diupload (tanpa caching)"""
     try:
         file_extension = uploaded_file.name.split('.')[-1].lower()
         
         if file_extension == 'csv':
             df = pd.read_csv(uploaded_file)
         elif file_extension in ['xlsx', 'xls']:
-            df = pd.read_excel(uploaded_file)
+            df = read_excel_sheets(uploaded_file)
         else:
             st.error("Format file tidak didukung! Gunakan file .csv, .xlsx, atau .xls")
             return pd.DataFrame()
@@ -118,12 +163,21 @@ def load_data_from_upload(uploaded_file):
             st.error(f"⚠️ Kolom yang diperlukan tidak ditemukan: {', '.join(missing_columns)}")
             return pd.DataFrame()
         
-        df['risiko_stunting'] = df['risiko_stunting'].astype(str).str.strip().str.title()
-        df['risiko_stunting'] = df['risiko_stunting'].replace({
-            '1': 'Berisiko', '0': 'Tidak Berisiko',
-            'True': 'Berisiko', 'False': 'Tidak Berisiko',
-            'Yes': 'Berisiko', 'No': 'Tidak Berisiko'
-        })
+        df['risiko_stunting'] = normalize_risk_column(df['risiko_stunting'])
+        
+        # Validasi koordinat terhadap batas kecamatan (jika file batas tersedia)
+        region_index = get_region_index()
+        if region_index is not None:
+            df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+            df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
+            df['kecamatan_terdeteksi'], df['lokasi_valid'] = validate_region_column(df, region_index)
+
+        # Kelurahan dari koordinat: mengisi namakelurahan yang kosong
+        kelurahan_index = get_kelurahan_index()
+        if kelurahan_index is not None:
+            df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+            df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
+            df['namakelurahan'], df['kelurahan_terdeteksi'], df['kelurahan_valid'] = assign_kelurahan(df, kelurahan_index)
         
         return df
         
@@ -131,111 +185,339 @@ def load_data_from_upload(uploaded_file):
         st.error(f"❌ Error saat membaca file: {str(e)}")
         return pd.DataFrame()
 
-def calculate_kecamatan_status(df):
-    """Calculate status untuk kecamatan berdasarkan dataframe yang diberikan (TIDAK LAGI CACHED)"""
-    kecamatan_stats = {}
-    
-    for kecamatan in df['namakecamatan'].unique():
-        df_kec = df[df['namakecamatan'] == kecamatan]
-        total = len(df_kec)
-        
-        if total == 0:
-            kecamatan_stats[kecamatan] = {
-                'status': 'Aman',
-                'persentase': 0.0,
-                'berisiko': 0,
-                'tidak_berisiko': 0,
-                'total': 0
-            }
-        else:
-            berisiko = len(df_kec[df_kec['risiko_stunting'] == 'Berisiko'])
-            tidak_berisiko = len(df_kec[df_kec['risiko_stunting'] == 'Tidak Berisiko'])
-            persentase = (berisiko / total) * 100
-            status = 'Rentan Stunting' if persentase > 20 else 'Aman'
-            
-            kecamatan_stats[kecamatan] = {
-                'status': status,
-                'persentase': persentase,
-                'berisiko': berisiko,
-                'tidak_berisiko': tidak_berisiko,
-                'total': total
-            }
-    
-    return kecamatan_stats
+@st.cache_data(show_spinner=False)
+def load_aggregates_from_upload(file_key, _uploaded_file):
+    """
+    Mode out-of-core: file upload di-spill ke disk lokal lalu di-scan per chunk.
+    Yang disimpan di memori hanya agregat per (kecamatan, tahun).
+    file_key dipakai sebagai kunci cache agar isi file tidak perlu di-hash.
+    """
+    try:
+        return aggregate_upload(_uploaded_file, region_index=get_region_index())
+    except Exception as e:
+        st.error(f"❌ Error saat membaca file: {str(e)}")
+        return pd.DataFrame()
+
+@st.cache_data(show_spinner=False)
+def build_upload_aggregates(file_key, _df):
+    """
+    Counter berisiko/total per (kecamatan, kelurahan, tahun), dihitung sekali per upload.
+    Perubahan filter atau threshold cukup memakai tabel kecil ini tanpa scan ulang data rumah tangga.
+    """
+    return aggregate_dataframe(_df)
+
+@st.cache_resource(show_spinner=False)
+def get_progressive_ingest(file_key, _uploaded_file):
+    """
+    Mode progresif: parsing per chunk di background thread, dibagi antar sesi
+    yang meng-upload file yang sama. Agregat berjalan dibaca lewat snapshot().
+    """
+    return progressive_upload(_uploaded_file, region_index=get_region_index())
+
+@st.cache_resource(show_spinner=False)
+def get_report_manager():
+    """Pool worker laporan bersama untuk seluruh sesi di proses ini"""
+    return ReportManager()
+
+@st.cache_data(show_spinner=False)
+def get_upload_hash(file_key, _uploaded_file):
+    """Hash isi file upload (kunci cache laporan)"""
+    return dataset_hash(_uploaded_file.getvalue())
+
+@st.fragment(run_every=2)
+def show_report_progress(keys):
+    """
+    Progress job laporan; hanya bagian ini yang di-refresh berkala, bukan seluruh halaman.
+    Setelah semua job selesai halaman di-rerun sekali sehingga polling berhenti.
+    """
+    done, total, errors = get_report_manager().progress(keys)
+    if total and done == total:
+        st.session_state['report_done'] = True
+        st.rerun()
+    st.progress(done / total if total else 1.0, text=f"Laporan selesai: {done}/{total} wilayah")
+    for error in errors:
+        st.error(f"❌ Gagal membuat laporan: {error}")
+
+def show_report_download(keys):
+    """Tombol unduh ZIP laporan; isi ZIP dibangun sekali lalu disimpan di session_state"""
+    manager = get_report_manager()
+    done, total, errors = manager.progress(keys)
+    st.progress(1.0, text=f"Laporan selesai: {done}/{total} wilayah")
+    for error in errors:
+        st.error(f"❌ Gagal membuat laporan: {error}")
+
+    if st.session_state.get('report_bundle_keys') != keys:
+        st.session_state['report_bundle'] = manager.bundle(keys)
+        st.session_state['report_bundle_keys'] = keys
+    st.download_button(
+        "⬇️ Unduh Semua Laporan (ZIP)",
+        data=st.session_state['report_bundle'],
+        file_name="laporan_risiko_stunting.zip",
+        mime="application/zip"
+    )
+
+def reset_reports(file_key=None):
+    """Melupakan job laporan sesi ini (mis. saat file lain di-upload)"""
+    for name in ['report_keys', 'report_done', 'report_bundle', 'report_bundle_keys']:
+        st.session_state.pop(name, None)
+    st.session_state['report_file'] = file_key
+
+@st.cache_data(show_spinner=False)
+def map_points_for_filter(file_key, kecamatan, tahun, _df):
+    """
+    Posisi marker per kecamatan untuk satu kombinasi filter, dihitung sekali
+    per (upload, kecamatan, tahun). Perubahan threshold tidak menghitung ulang posisi.
+    """
+    df = _df
+    if kecamatan != 'Semua':
+        df = df[df['namakecamatan'] == kecamatan]
+    if tahun != 'Semua' and 'tahun' in df.columns:
+        df = df[df['tahun'] == tahun]
 
-def generate_map(df, kecamatan_stats):
-    """Generate map dengan custom marker icons (TIDAK LAGI CACHED)"""
-    if df.empty:
-        return None
-        
     df = df.dropna(subset=['lat', 'lon'])
-    
     if df.empty:
-        return None
-
-    # Group data untuk efisiensi
-    map_data = df.groupby('namakecamatan').agg({
-        'lat': 'mean',
-        'lon': 'mean'
-    }).reset_index()
-
-    m = folium.Map(
-        location=[df['lat'].mean(), df['lon'].mean()], 
-        zoom_start=12,
-        prefer_canvas=True
+        return pd.DataFrame(columns=['namakecamatan', 'lat', 'lon']), None
+
+    # Posisi marker: median titik yang lolos validasi wilayah (tahan terhadap salah geocode)
+    valid_mask = df['lokasi_valid'] if 'lokasi_valid' in df.columns else None
+    map_data = robust_centroids(df, valid_mask, get_region_index())
+
+    if map_data.empty:
+        return map_data, None
+
+    return map_data, [map_data['lat'].median(), map_data['lon'].median()]
+
+# ================= FRAGMENTS ================= #
+
+def show_metric_cards(total_keluarga, total_kecamatan, jumlah_aman, jumlah_rentan):
+    """Empat kartu metrik utama halaman visualisasi"""
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.markdown(f"""
+            <div class="metric-card">
+                <div class="metric-number">{total_keluarga:,}</div>
+                <div class="metric-label">📊 Total Data Keluarga</div>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        st.markdown(f"""
+            <div class="metric-card" style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);">
+                <div class="metric-number">{total_kecamatan}</div>
+                <div class="metric-label">📍 Total Kecamatan</div>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown(f"""
+            <div class="metric-card" style="background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);">
+                <div class="metric-number">{jumlah_aman}</div>
+                <div class="metric-label">✅ Kecamatan Aman</div>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        st.markdown(f"""
+            <div class="metric-card" style="background: linear-gradient(135deg, #fa709a 0%, #fee140 100%);">
+                <div class="metric-number">{jumlah_rentan}</div>
+                <div class="metric-label">⚠️ Kecamatan Rentan</div>
+            </div>
+        """, unsafe_allow_html=True)
+
+
+@st.fragment
+def show_threshold_comparison(aggregates_filtered, threshold, has_kelurahan):
+    """Perbandingan multi-threshold; mengubah pilihan threshold hanya menjalankan ulang tabel ini"""
+    thresholds = st.multiselect(
+        "Threshold yang dibandingkan (%)",
+        options=list(range(5, 55, 5)),
+        default=[10, 15, 20, 25, 30]
     )
+    if thresholds:
+        thresholds = sorted(set(thresholds) | {threshold})
+        comparison = compare_thresholds(region_counts(aggregates_filtered, 'namakecamatan'), thresholds)
+        comparison = comparison.rename(columns={
+            'threshold': 'Threshold (%)', 'rentan': 'Kecamatan Rentan', 'aman': 'Kecamatan Aman'
+        })
+        if has_kelurahan:
+            kelurahan_comparison = compare_thresholds(region_counts(aggregates_filtered, KELURAHAN_LEVEL), thresholds)
+            comparison['Kelurahan Rentan'] = kelurahan_comparison['rentan']
+            comparison['Kelurahan Aman'] = kelurahan_comparison['aman']
+        st.dataframe(comparison, use_container_width=True, hide_index=True)
+        st.line_chart(comparison.set_index('Threshold (%)').filter(like='Rentan'))
+
+@st.fragment
+def show_dashboard(file_key, aggregates, df, uploaded_file):
+    """
+    Filter, metrik, tabel wilayah dan peta. Perubahan filter/threshold hanya menjalankan
+    ulang fragment ini: upload, parsing, preview dan CSS halaman tidak dieksekusi ulang.
+    Agregat dan posisi marker di-memoize per (upload, kecamatan, tahun).
+    df bernilai None pada mode out-of-core (hanya agregat yang tersedia).
+    """
+    has_tahun = 'tahun' in aggregates.columns
+    has_kelurahan = 'namakelurahan' in aggregates.columns
+
+    # Filter Data
+    st.markdown('<h2 class="section-header">🔍 Filter Data</h2>', unsafe_allow_html=True)
+    col_kecamatan, col_tahun, col_threshold = st.columns(3)
+
+    with col_kecamatan:
+        kec = ['Semua'] + sorted(aggregates['namakecamatan'].unique())
+        kecamatan = st.selectbox("📍 Pilih Kecamatan", kec)
+
+    with col_tahun:
+        if has_tahun:
+            tahun = ['Semua'] + sorted(aggregates['tahun'].dropna().unique(), reverse=True)
+            tahun_select = st.selectbox("📅 Pilih Tahun", tahun)
+        else:
+            tahun_select = 'Semua'
+
+    with col_threshold:
+        threshold = st.slider(
+            "🎚️ Threshold Rentan Stunting (%)",
+            min_value=1,
+            max_value=50,
+            value=WHO_THRESHOLD,
+            help=f"Standar WHO: {WHO_THRESHOLD}%. Geser untuk analisis what-if; status wilayah dihitung ulang dari counter per wilayah."
+        )
 
-    for _, row in map_data.iterrows():
-        kec_name = row['namakecamatan']
-        stats = kecamatan_stats[kec_name]
+    # Filter tabel agregat (tanpa menyentuh baris mentah)
+    aggregates_filtered = filter_aggregates(aggregates, kecamatan, tahun_select)
+
+    if aggregates_filtered.empty:
+        st.warning("❗ Tidak ada data untuk filter yang dipilih.")
+        return
+
+    # Reklasifikasi semua kecamatan pada threshold terpilih (perbandingan vektor)
+    kecamatan_stats = kecamatan_stats_from_aggregates(aggregates_filtered, threshold)
+    total_keluarga = int(aggregates_filtered['total'].sum())
+    total_kecamatan = aggregates_filtered['namakecamatan'].nunique()
+
+    # Calculate metrics
+    jumlah_aman = sum(1 for s in kecamatan_stats.values() if s['status'] == 'Aman')
+    jumlah_rentan = sum(1 for s in kecamatan_stats.values() if s['status'] == 'Rentan Stunting')
+
+    show_metric_cards(total_keluarga, total_kecamatan, jumlah_aman, jumlah_rentan)
+
+    # Analisis what-if threshold
+    with st.expander("📊 Perbandingan Multi-Threshold"):
+        show_threshold_comparison(aggregates_filtered, threshold, has_kelurahan)
+
+    if has_kelurahan:
+        with st.expander(f"🏘️ Status per Kelurahan (threshold {threshold}%)"):
+            kelurahan_counts = region_counts(aggregates_filtered, KELURAHAN_LEVEL)
+            kelurahan_counts['status'] = classify_regions(kelurahan_counts, threshold)
+            st.dataframe(
+                kelurahan_counts.sort_values('persentase', ascending=False),
+                use_container_width=True
+            )
+
+    # Laporan per kecamatan (diproses di background worker)
+    with st.expander("📑 Laporan Excel & PDF per Kecamatan/Kelurahan"):
+        st.markdown(
+            f"Laporan dibuat untuk setiap kecamatan pada tahun **{tahun_select}** dengan threshold **{threshold}%**. "
+            "Proses berjalan di background dan tidak menghambat halaman ini."
+        )
+        include_kelurahan = has_kelurahan and st.checkbox(
+            "Sertakan laporan per kelurahan",
+            help="Selain laporan per kecamatan, buat satu laporan untuk setiap kelurahan"
+        )
+        # Laporan dari file sebelumnya tidak ditawarkan untuk file baru
+        if st.session_state.get('report_file') != file_key:
+            reset_reports(file_key)
+        if st.button("🗂️ Buat Laporan Semua Wilayah"):
+            reset_reports(file_key)
+            st.session_state['report_keys'] = get_report_manager().submit_all(
+                aggregates, get_upload_hash(file_key, uploaded_file), tahun_select, threshold, include_kelurahan
+            )
+        if st.session_state.get('report_done'):
+            show_report_download(st.session_state['report_keys'])
+        elif st.session_state.get('report_keys'):
+            show_report_progress(st.session_state['report_keys'])
+
+    # Peta
+    st.markdown('<h2 class="section-header">🗺️ Peta Keluarga Rentan Stunting</h2>', unsafe_allow_html=True)
         
-        is_aman = stats['status'] == 'Aman'
-        status_emoji = "✅" if is_aman else "⚠️"
-        status_color = "#51cf66" if is_aman else "#ff6b6b"
-
-        popup_html = f"""
-        <div style="font-size: 14px; font-family: 'Poppins', sans-serif; min-width: 250px;">
-            <b style="color: #667eea;">📍 Kecamatan:</b> {kec_name}<br>
-            <b style="color: {status_color};">{status_emoji} Status:</b> <b>{stats['status']}</b><br>
-            <b style="color: #ff6b6b;">📊 Persentase Berisiko:</b> <b>{stats['persentase']:.1f}%</b><br><br>
-            <b style="color: #667eea;">📈 Distribusi Data:</b><br>
-            ✅ Tidak Berisiko: <b>{stats['tidak_berisiko']}</b> ({stats['tidak_berisiko']/stats['total']*100:.1f}%)<br>
-            ⚠️ Berisiko: <b>{stats['berisiko']}</b> ({stats['berisiko']/stats['total']*100:.1f}%)<br>
-            <b style="color: #764ba2;">📊 Total Data: {stats['total']}</b><br><br>
-            <i style="color: #999; font-size: 11px;">
-            * Standar WHO: >20% Berisiko = Rentan Stunting<br>
-            * ≤20% Berisiko = Aman
-            </i>
+    st.markdown(f"""
+        <div class="legend-container">
+            <h4 style="margin-top: 0; color: #667eea;">📍 Legenda Peta (Threshold {threshold}%)</h4>
+            <div style="display: flex; justify-content: space-around; flex-wrap: wrap;">
+                <div style="display: flex; align-items: center; margin: 5px;">
+                    <div style="width: 20px; height: 20px; background-color: #51cf66; border-radius: 50%; margin-right: 10px;"></div>
+                    <span><b>Kecamatan Aman</b> (≤{threshold}% Berisiko)</span>
+                </div>
+                <div style="display: flex; align-items: center; margin: 5px;">
+                    <div style="width: 20px; height: 20px; background-color: #ff6b6b; border-radius: 50%; margin-right: 10px;"></div>
+                    <span><b>Kecamatan Rentan Stunting</b> (>{threshold}% Berisiko)</span>
+                </div>
+            </div>
         </div>
-        """
+    """, unsafe_allow_html=True)
+    
+    # Posisi marker dihitung sekali per filter; peta dasar tetap, hanya layer marker yang diganti
+    if df is None:
+        map_data, center = map_points_from_aggregates(aggregates_filtered)
+        base_center = map_points_from_aggregates(aggregates)[1]
+    else:
+        map_data, center = map_points_for_filter(file_key, kecamatan, tahun_select, df)
+        base_center = map_points_for_filter(file_key, 'Semua', 'Semua', df)[1]
 
-        # Gunakan custom icon
-        icon_path = get_icon_path(stats['status'])
-        
-        # Cek apakah file icon ada
-        if Path(icon_path).exists():
-            custom_icon = CustomIcon(
-                icon_path,
-                icon_size=(40, 40),
-                icon_anchor=(20, 40),
-                popup_anchor=(0, -40)
-            )
-            
-            folium.Marker(
-                location=[row['lat'], row['lon']],
-                icon=custom_icon,
-                popup=folium.Popup(popup_html, max_width=400)
-            ).add_to(m)
-        else:
-            # Fallback ke icon default jika file tidak ditemukan
-            color = 'green' if is_aman else 'red'
-            folium.Marker(
-                location=[row['lat'], row['lon']],
-                icon=folium.Icon(color=color, icon='info-sign'),
-                popup=folium.Popup(popup_html, max_width=400)
-            ).add_to(m)
+    if map_data.empty or center is None:
+        st.error("Tidak dapat menampilkan peta. Pastikan data koordinat tersedia.")
+        return
 
-    return m
+    st_folium(
+        base_map(base_center or center),
+        key="peta_kecamatan",
+        feature_group_to_add=build_markers(map_data, kecamatan_stats, threshold),
+        center=center,
+        height=600,
+        width=None,
+        returned_objects=[]
+    )
+
+@st.fragment(run_every=1)
+def show_progressive_ingest(ingest):
+    """
+    Hasil sementara selama file masih diproses: progres, metrik dan marker peta
+    dari agregat berjalan. Setelah parsing selesai, halaman dijalankan ulang
+    dengan dashboard lengkap.
+    """
+    if ingest.done:
+        st.rerun()
+
+    aggregates = ingest.snapshot()
+    progress = ingest.progress()
+    st.progress(progress, text=f"⏳ Memproses file... {ingest.rows_read:,} baris dibaca ({progress:.0%})")
+
+    if aggregates.empty:
+        return
+
+    kecamatan_stats = kecamatan_stats_from_aggregates(aggregates, WHO_THRESHOLD)
+    jumlah_aman = sum(1 for s in kecamatan_stats.values() if s['status'] == 'Aman')
+    show_metric_cards(
+        int(aggregates['total'].sum()),
+        aggregates['namakecamatan'].nunique(),
+        jumlah_aman,
+        len(kecamatan_stats) - jumlah_aman
+    )
+
+    st.caption(f"Hasil sementara dengan threshold WHO {WHO_THRESHOLD}%; filter tersedia setelah seluruh file diproses.")
+    map_data, center = map_points_from_aggregates(aggregates)
+    if map_data.empty or center is None:
+        return
+
+    # Key peta sama dengan dashboard lengkap: hanya layer marker yang diperbarui tiap chunk
+    st_folium(
+        base_map(center),
+        key="peta_kecamatan",
+        feature_group_to_add=build_markers(map_data, kecamatan_stats, WHO_THRESHOLD),
+        center=center,
+        height=600,
+        width=None,
+        returned_objects=[]
+    )
 
 # ========== Main App ========== #
 def main():
@@ -305,48 +587,95 @@ def main():
         st.dataframe(sample_data, use_container_width=True)
         return
     
-    # Load data dengan caching
-    with st.spinner('Loading data...'):
-        df = load_data_from_upload(uploaded_file)
-    
-    if df.empty:
-        return
-    
-    st.success(f"✅ File berhasil dimuat! Total data: {len(df):,} baris")
-    
-    # Preview data
-    with st.expander("👁️ Preview Data yang Diupload"):
-        st.dataframe(df.head(10), use_container_width=True)
+    # File batas wilayah tidak disertakan di repo (lihat spatial_index.py untuk sumber datanya)
+    if get_region_index() is None:
+        st.warning(f"⚠️ File batas kecamatan `{KECAMATAN_BOUNDARY_PATH}` tidak ditemukan: koordinat **tidak** "
+                   "divalidasi terhadap batas kecamatan dan posisi marker memakai median koordinat per kecamatan. "
+                   "Titik yang salah geocode tetap ikut dihitung.")
+    if get_kelurahan_index() is None:
+        st.warning(f"⚠️ File batas kelurahan `{KELURAHAN_BOUNDARY_PATH}` tidak ditemukan: kelurahan yang kosong "
+                   "tidak diisi dari koordinat.")
 
-    # Sidebar Filter
-    with st.sidebar:
-        st.markdown("""
-            <div style="text-align: center; padding: 20px 0;">
-                <h2 style="color: #667eea; font-weight: 700;">🔍 Filter Data</h2>
-            </div>
-        """, unsafe_allow_html=True)
+    # Mode out-of-core untuk file besar: hanya agregat yang disimpan di memori
+    file_size_mb = uploaded_file.size / (1024 * 1024)
+    out_of_core = st.checkbox(
+        "💾 Mode hemat memori (out-of-core) untuk file besar",
+        value=file_size_mb > OUT_OF_CORE_THRESHOLD_MB,
+        help="File disalin ke disk lokal dan diproses per bagian. Statistik dan peta dihitung dari agregat "
+             "per kecamatan/tahun tanpa memuat seluruh baris ke memori."
+    )
+
+    progressive = out_of_core and st.checkbox(
+        "⚡ Tampilkan hasil sementara selama file diproses",
+        value=True,
+        help="File diproses per bagian di background; metrik dan marker peta diperbarui setiap bagian selesai."
+    )
+
+    file_key = (uploaded_file.name, uploaded_file.size, getattr(uploaded_file, 'file_id', None))
+
+    if progressive:
+        ingest = get_progressive_ingest(file_key, uploaded_file)
+        if ingest.error is not None:
+            st.error(f"❌ Error saat membaca file: {str(ingest.error)}")
+            return
+        if not ingest.done:
+            show_progressive_ingest(ingest)
+            return
+
+        aggregates = ingest.snapshot()
+        if aggregates.empty:
+            return
+
+        st.success(f"✅ File berhasil diproses! Total data: {int(aggregates['total'].sum()):,} baris")
+    elif out_of_core:
+        with st.spinner('Memproses file secara bertahap...'):
+            aggregates = load_aggregates_from_upload(file_key, uploaded_file)
+
+        if aggregates.empty:
+            return
+
+        st.success(f"✅ File berhasil diproses! Total data: {int(aggregates['total'].sum()):,} baris")
+    else:
+        # Load data dengan caching (memory-mapped bila KRS_SHARED_DIR di-set)
+        with st.spinner('Loading data...'):
+            if shared_dir() is not None:
+                df = load_shared_data_from_upload(file_key, uploaded_file)
+            else:
+                df = load_data_from_upload(uploaded_file)
         
-        kec = ['Semua'] + sorted(df['namakecamatan'].unique())
+        if df.empty:
+            return
         
-        kecamatan = st.selectbox("📍 Pilih Kecamatan", kec)
+        st.success(f"✅ File berhasil dimuat! Total data: {len(df):,} baris")
+
+        if 'lokasi_valid' in df.columns:
+            jumlah_tidak_valid = int((~df['lokasi_valid']).sum())
+            if jumlah_tidak_valid > 0:
+                st.warning(
+                    f"📍 {jumlah_tidak_valid:,} baris memiliki koordinat di luar kecamatan yang tertulis "
+                    "dan tidak dipakai untuk posisi marker."
+                )
         
-        if 'tahun' in df.columns:
-            tahun = ['Semua'] + sorted(df['tahun'].unique(), reverse=True)
-            tahun_select = st.selectbox("📅 Pilih Tahun", tahun)
-        else:
-            tahun_select = 'Semua'
+        # Preview data
+        with st.expander("👁️ Preview Data yang Diupload"):
+            st.dataframe(df.head(10), use_container_width=True)
 
-        st.markdown("""
+        # Counter per wilayah dihitung sekali per upload
+        aggregates = build_upload_aggregates(file_key, df)
+
+    # Sidebar: keterangan standar WHO (statis, tidak ikut dijalankan ulang saat filter berubah)
+    with st.sidebar:
+        st.markdown(f"""
             <div class="info-box">
                 <h4>ℹ️ Standar WHO</h4>
                 <p style="font-size: 13px; line-height: 1.6;">
-                <b>"Suatu wilayah dikatakan memiliki masalah stunting bila kasusnya mencapai angka di atas 20%"</b>
+                <b>"Suatu wilayah dikatakan memiliki masalah stunting bila kasusnya mencapai angka di atas {WHO_THRESHOLD}%"</b>
                 </p>
                 <hr style="border-color: rgba(255,255,255,0.3); margin: 10px 0;">
                 <p><b>✅ Kecamatan Aman (Hijau):</b><br>
-                Persentase Berisiko ≤ 20%</p>
+                Persentase Berisiko ≤ threshold</p>
                 <p><b>⚠️ Kecamatan Rentan (Merah):</b><br>
-                Persentase Berisiko > 20%</p>
+                Persentase Berisiko > threshold</p>
                 <hr style="border-color: rgba(255,255,255,0.3); margin: 10px 0;">
                 <p style="font-size: 12px; opacity: 0.9;">
                 Klik marker pada peta untuk melihat detail lengkap setiap kecamatan
@@ -354,85 +683,8 @@ def main():
             </div>
         """, unsafe_allow_html=True)
 
-    # Filter DataFrame
-    df_filtered = df.copy()
-    if kecamatan != 'Semua':
-        df_filtered = df_filtered[df_filtered['namakecamatan'] == kecamatan]
-    if tahun_select != 'Semua' and 'tahun' in df.columns:
-        df_filtered = df_filtered[df_filtered['tahun'] == tahun_select]
-
-    if df_filtered.empty:
-        st.warning("❗ Tidak ada data untuk filter yang dipilih.")
-        return
-
-    # PERBAIKAN UTAMA: Hitung statistik berdasarkan data yang SUDAH DIFILTER
-    with st.spinner('Calculating statistics...'):
-        kecamatan_stats = calculate_kecamatan_status(df_filtered)
-
-    # Calculate metrics
-    jumlah_aman = sum(1 for s in kecamatan_stats.values() if s['status'] == 'Aman')
-    jumlah_rentan = sum(1 for s in kecamatan_stats.values() if s['status'] == 'Rentan Stunting')
-
-    # Metrics Cards
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.markdown(f"""
-            <div class="metric-card">
-                <div class="metric-number">{len(df_filtered):,}</div>
-                <div class="metric-label">📊 Total Data Keluarga</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        st.markdown(f"""
-            <div class="metric-card" style="background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);">
-                <div class="metric-number">{df_filtered['namakecamatan'].nunique()}</div>
-                <div class="metric-label">📍 Total Kecamatan</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        st.markdown(f"""
-            <div class="metric-card" style="background: linear-gradient(135deg, #43e97b 0%, #38f9d7 100%);">
-                <div class="metric-number">{jumlah_aman}</div>
-                <div class="metric-label">✅ Kecamatan Aman</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        st.markdown(f"""
-            <div class="metric-card" style="background: linear-gradient(135deg, #fa709a 0%, #fee140 100%);">
-                <div class="metric-number">{jumlah_rentan}</div>
-                <div class="metric-label">⚠️ Kecamatan Rentan</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    # Peta
-    st.markdown('<h2 class="section-header">🗺️ Peta Keluarga Rentan Stunting</h2>', unsafe_allow_html=True)
-        
-    st.markdown("""
-        <div class="legend-container">
-            <h4 style="margin-top: 0; color: #667eea;">📍 Legenda Peta (Berdasarkan Standar WHO)</h4>
-            <div style="display: flex; justify-content: space-around; flex-wrap: wrap;">
-                <div style="display: flex; align-items: center; margin: 5px;">
-                    <div style="width: 20px; height: 20px; background-color: #51cf66; border-radius: 50%; margin-right: 10px;"></div>
-                    <span><b>Kecamatan Aman</b> (≤20% Berisiko)</span>
-                </div>
-                <div style="display: flex; align-items: center; margin: 5px;">
-                    <div style="width: 20px; height: 20px; background-color: #ff6b6b; border-radius: 50%; margin-right: 10px;"></div>
-                    <span><b>Kecamatan Rentan Stunting</b> (>20% Berisiko)</span>
-                </div>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
-    
-    with st.spinner('Generating map...'):
-        map_obj = generate_map(df_filtered, kecamatan_stats)
-        if map_obj:
-            st_folium(map_obj, height=600, width=None, returned_objects=[])
-        else:
-            st.error("Tidak dapat menampilkan peta. Pastikan data koordinat tersedia.")
+    # Filter, metrik dan peta dijalankan ulang sendiri tanpa mengeksekusi ulang halaman
+    show_dashboard(file_key, aggregates, None if out_of_core else df, uploaded_file)
 
     # Footer
     st.markdown("""
@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_refresh import file_digest
+
+# ===============================
+# Penyimpanan lokal hasil skor model (SQLite)
+# ===============================
+STORE_PATH = "prediksi_risiko_stunting.sqlite"
+# Lokasi store alternatif (mis. load test) tanpa menyentuh riwayat asli
+STORE_PATH_ENV = "KRS_PREDICTION_STORE"
+INSERT_BATCH_SIZE = 10_000
+# Batas parameter per query SQLite (SQLITE_MAX_VARIABLE_NUMBER lama = 999)
+LOOKUP_BATCH_SIZE = 900
+
+# Satu baris per rumah tangga yang diskor. Hash fitur hanya dipakai untuk
+# melewati pemanggilan model ulang, bukan untuk menggabungkan baris: keluarga
+# berbeda dengan jawaban sama tetap dihitung masing-masing di agregat wilayah.
+TABLE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    feature_hash INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    features TEXT NOT NULL,
+    probability REAL NOT NULL,
+    namakecamatan TEXT,
+    namakelurahan TEXT,
+    tahun INTEGER,
+    household_id TEXT,
+    scored_at TEXT NOT NULL
+);
+"""
+
+INDEX_SCHEMA = """
+-- Indeks unik lama (fitur + wilayah) menggabungkan keluarga berbeda menjadi satu baris
+DROP INDEX IF EXISTS idx_predictions_unique;
+CREATE INDEX IF NOT EXISTS idx_predictions_feature
+    ON predictions (feature_hash, model_version);
+CREATE INDEX IF NOT EXISTS idx_predictions_wilayah
+    ON predictions (namakecamatan, namakelurahan, tahun);
+CREATE INDEX IF NOT EXISTS idx_predictions_tahun
+    ON predictions (tahun);
+-- Skor ulang keluarga yang sama (ID keluarga + versi model) memperbarui barisnya
+CREATE UNIQUE INDEX IF NOT EXISTS idx_predictions_household
+    ON predictions (household_id, model_version) WHERE household_id IS NOT NULL;
+"""
+
+REGION_COLUMNS = ['namakecamatan', 'namakelurahan', 'tahun']
+RECORD_COLUMNS = REGION_COLUMNS + ['household_id']
+
+
+def model_version(model_path, backend="keras"):
+    """Versi model: nama file + backend + potongan SHA-1 isi file bobot"""
+    return f"{Path(model_path).stem}:{backend}:{file_digest(model_path)[:12]}"
+
+
+def feature_hashes(features):
+    """
+    Hash 64-bit per baris vektor fitur (mentah, sebelum scaling), dihitung
+    vektorisasi dengan hash_pandas_object lalu disimpan sebagai INTEGER SQLite.
+    """
+    features = features.astype(np.float64).reset_index(drop=True)
+    return pd.util.hash_pandas_object(features, index=False).to_numpy().view(np.int64)
+
+
+def _sql_value(value):
+    """NaN/None -> NULL, numpy scalar -> tipe Python"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def store_path():
+    """Path store dari environment KRS_PREDICTION_STORE, default STORE_PATH"""
+    return os.environ.get(STORE_PATH_ENV) or STORE_PATH
+
+
+class PredictionStore:
+    """
+    Hasil skor per rumah tangga: vektor fitur, hash fitur, probabilitas,
+    versi model, serta wilayah/tahun bila diketahui. Satu koneksi dipakai
+    bersama antar sesi Streamlit (st.cache_resource), dilindungi lock.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or store_path())
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(TABLE_SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(predictions)")}
+        if 'household_id' not in columns:
+            self.connection.execute("ALTER TABLE predictions ADD COLUMN household_id TEXT")
+        self.connection.executescript(INDEX_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+    def lookup(self, hashes, version):
+        """Probabilitas yang sudah tersimpan untuk hash fitur tertentu: {hash: probabilitas}"""
+        unique_hashes = [int(value) for value in pd.unique(np.asarray(hashes))]
+        found = {}
+        with self._lock:
+            for start in range(0, len(unique_hashes), LOOKUP_BATCH_SIZE):
+                batch = unique_hashes[start:start + LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT feature_hash, probability FROM predictions "
+                    f"WHERE model_version = ? AND feature_hash IN ({placeholders})",
+                    [version, *batch]
+                )
+                found.update(rows)
+        return found
+
+    def insert_many(self, features, hashes, probabilities, version, regions=None, batch_size=INSERT_BATCH_SIZE):
+        """
+        Menyimpan banyak hasil skor sekaligus (executemany per batch, satu transaksi per batch).
+        Setiap baris input menjadi satu baris store (satu rumah tangga).
+        regions: DataFrame opsional dengan kolom namakecamatan/namakelurahan/tahun
+        dan household_id; baris dengan household_id yang sudah diskor versi model
+        yang sama diperbarui, bukan ditambah.
+        """
+        scored_at = datetime.now().isoformat(timespec='seconds')
+        feature_json = [json.dumps(row) for row in features.astype(float).values.tolist()]
+        if regions is None:
+            regions = pd.DataFrame(index=range(len(features)), columns=RECORD_COLUMNS)
+        regions = regions.reindex(columns=RECORD_COLUMNS).astype(object).to_numpy()
+
+        def household(value):
+            value = _sql_value(value)
+            return None if value is None or str(value).strip() == '' else str(value).strip()
+
+        rows = (
+            (int(hashes[i]), version, feature_json[i], float(probabilities[i]),
+             _sql_value(regions[i][0]), _sql_value(regions[i][1]),
+             None if _sql_value(regions[i][2]) is None else int(regions[i][2]),
+             household(regions[i][3]), scored_at)
+            for i in range(len(features))
+        )
+
+        inserted = 0
+        with self._lock:
+            while True:
+                batch = [row for _, row in zip(range(batch_size), rows)]
+                if not batch:
+                    break
+                with self.connection:
+                    cursor = self.connection.executemany(
+                        "INSERT INTO predictions (feature_hash, model_version, features, probability, "
+                        "namakecamatan, namakelurahan, tahun, household_id, scored_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (household_id, model_version) WHERE household_id IS NOT NULL DO UPDATE SET "
+                        "feature_hash = excluded.feature_hash, features = excluded.features, "
+                        "probability = excluded.probability, namakecamatan = excluded.namakecamatan, "
+                        "namakelurahan = excluded.namakelurahan, tahun = excluded.tahun, "
+                        "scored_at = excluded.scored_at",
+                        batch
+                    )
+                    inserted += cursor.rowcount
+        return inserted
+
+    def score(self, predict, features, version, regions=None):
+        """
+        Skor dengan deduplikasi: vektor fitur yang sudah pernah diskor oleh versi
+        model yang sama diambil dari store, hanya sisanya yang dijalankan ke model.
+        Cache hanya menghemat pemanggilan model; setiap baris input tetap disimpan.
+        predict: fungsi DataFrame fitur -> array probabilitas.
+        Mengembalikan (probabilitas, jumlah_baris_dari_cache).
+        """
+        hashes = feature_hashes(features)
+        cached = self.lookup(hashes, version)
+
+        probabilities = np.array([cached.get(int(value), np.nan) for value in hashes], dtype=np.float64)
+        missing = np.isnan(probabilities)
+        if missing.any():
+            # Vektor fitur identik dalam satu batch cukup diskor sekali
+            missing_hashes, first_index = np.unique(hashes[missing], return_index=True)
+            to_score = features[missing].iloc[first_index]
+            scores = np.asarray(predict(to_score), dtype=np.float64).reshape(-1)
+            score_by_hash = dict(zip(missing_hashes.tolist(), scores))
+            probabilities[missing] = [score_by_hash[int(value)] for value in hashes[missing]]
+
+        self.insert_many(features, hashes, probabilities, version, regions)
+        return probabilities, int((~missing).sum())
+
+    def aggregate(self, level='namakecamatan', tahun=None, version=None, threshold=0.5):
+        """
+        Agregat skor per wilayah langsung dari SQLite (memakai indeks wilayah):
+        total, jumlah berisiko (probabilitas >= threshold), dan rata-rata probabilitas.
+        """
+        if level not in REGION_COLUMNS:
+            raise ValueError(f"Level agregasi tidak dikenal: {level}")
+
+        conditions, params = [], [threshold]
+        if tahun is not None:
+            conditions.append("tahun = ?")
+            params.append(int(tahun))
+        if version is not None:
+            conditions.append("model_version = ?")
+            params.append(version)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        query = (
+            f"SELECT {level}, COUNT(*) AS total, SUM(probability >= ?) AS berisiko, "
+            f"AVG(probability) AS rata_rata_probabilitas FROM predictions {where} "
+            f"GROUP BY {level} ORDER BY {level}"
+        )
+        with self._lock:
+            result = pd.read_sql_query(query, self.connection, params=params)
+        result['persentase'] = np.where(result['total'] > 0, result['berisiko'] / result['total'] * 100, 0.0)
+        return result
+
+    def count(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # Contoh: python prediction_store.py namakecamatan 2024
+    level = sys.argv[1] if len(sys.argv) > 1 else 'namakecamatan'
+    tahun = sys.argv[2] if len(sys.argv) > 2 else None
+    store = PredictionStore()
+    print(f"{store.count():,} skor tersimpan di {store.path}")
+    print(store.aggregate(level, tahun).to_string(index=False))
@@ -1,6 +1,12 @@
+import sys
+
 import pandas as pd
 
-def process_drop_columns_with_year(df):
+from summary import build_summary, summary_path, write_summary
+from validation import REJECTION_PATH, duplicate_rows, rejection_summary, validate_dataset
+from writers import write_output, write_xlsx_streaming
+
+def process_drop_columns_with_year(df, rejection_path=REJECTION_PATH):
     """
     Preprocessing dataset dengan menghapus semua kolom
     kecuali:
@@ -9,6 +15,9 @@ def process_drop_columns_with_year(df):
     - nama_kelurahan
     - nama_kecamatan
     - tahun
+
+    Baris yang gagal validasi ditulis ke rejection_path
+    (None = tidak ditulis).
     """
 
     # ===============================
@@ -76,16 +85,21 @@ def process_drop_columns_with_year(df):
     # ===============================
     # 5. Drop kolom selain yang dibutuhkan
     # ===============================
+    # Duplikat dicek pada baris asli lengkap (atau ID keluarga) sebelum kolom dibuang
+    duplicates = duplicate_rows(df)
     df = df[required_columns]
 
     # ===============================
-    # 6. Optional: cleaning dasar
+    # 6. Validasi kualitas data
     # ===============================
-    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
-    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
-    df["tahun"] = pd.to_numeric(df["tahun"], errors="coerce")
+    # Koordinat di luar Bogor, duplikat, ejaan kecamatan tak dikenal dan
+    # label tidak valid ditolak dan dicatat beserta kode alasannya
+    df, rejected = validate_dataset(df, duplicates=duplicates)
 
-    df = df.dropna(subset=["lat", "lon", "tahun"])
+    if rejection_path and not rejected.empty:
+        write_output(rejected, rejection_path)
+        print(f"{len(rejected):,} baris ditolak, detail di {rejection_path}")
+        print(rejection_summary(rejected).to_string())
 
     return df
 
@@ -93,16 +107,34 @@ def process_drop_columns_with_year(df):
 def export_to_excel(df, output_path):
     """
     Menyimpan DataFrame hasil preprocessing
-    ke file Excel (.xlsx)
+    ke file Excel (.xlsx) secara streaming
+    (sheet otomatis dipecah jika melebihi batas baris Excel)
+    """
+    write_xlsx_streaming(df, output_path)
+
+
+def export_output(df, output_path, fmt=None):
+    """
+    Menyimpan DataFrame hasil preprocessing dengan format
+    sesuai ekstensi: .parquet, .csv / .csv.gz, atau .xlsx
     """
-    df.to_excel(output_path, index=False)
+    return write_output(df, output_path, fmt)
+
 
+if __name__ == "__main__":
+    # Contoh: python preprocessing.py dataset_stunting_preprocessed.parquet
+    output_path = sys.argv[1] if len(sys.argv) > 1 else "dataset_stunting_preprocessed.xlsx"
 
-df = pd.read_excel("KRS - 3201 Bogor Th. 2024.xlsx")
+    df = pd.read_excel("KRS - 3201 Bogor Th. 2024.xlsx")
 
-df_processed = process_drop_columns_with_year(df)
+    df_processed = process_drop_columns_with_year(df)
 
-export_to_excel(
-    df_processed,
-    "dataset_stunting_preprocessed.xlsx"
-)
+    seconds = export_output(df_processed, output_path)
+    print(f"Hasil preprocessing ({len(df_processed):,} baris) disimpan ke {output_path} dalam {seconds:.2f} detik")
+
+    # Snapshot ringkasan kecil di sebelah file output; Home membaca snapshot ini
+    # (tanpa memuat baris mentah) bila file output dipakai sebagai penelitian_bersih.xlsx
+    write_summary(
+        build_summary(df_processed, source=output_path),
+        summary_path(output_path)
+    )
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dataset_refresh import normalize_risk_labels, read_dataset
+from validation import VALID_LABELS
+
+# ===============================
+# Kuantisasi pasca-training model LSTM
+# ===============================
+MODELS = {
+    "2layer": ("model_lstm_2layer_risiko_stunting.h5", "preprocess_lstm_2layer_risiko_stunting.pkl"),
+    "3layer": ("model_lstm_3layer_risiko_stunting.h5", "preprocess_lstm_3layer_risiko_stunting.pkl"),
+}
+VARIANTS = ["int8", "float16"]
+REPORT_PATH = "laporan_kuantisasi.json"
+
+
+def quantized_model_path(model_path, variant):
+    """Lokasi file .tflite hasil kuantisasi, misal model_..._int8.tflite"""
+    return str(Path(model_path).with_suffix('')) + f"_{variant}.tflite"
+
+
+def load_preprocess(pkl_path):
+    """Membaca scaler dan metadata fitur yang disimpan saat training"""
+    with open(pkl_path, "rb") as file:
+        return pickle.load(file)
+
+
+def prepare_features(data, preprocess_data):
+    """Memilih kolom fitur, scaling, dan membentuk input LSTM (batch, time_steps, fitur)"""
+    scaler = preprocess_data["scaler"]
+    feature_columns = list(preprocess_data.get("feature_columns") or scaler.feature_names_in_)
+    sequence_length = preprocess_data.get("sequence_length", 1)
+
+    scaled = scaler.transform(data[feature_columns])
+    return scaled.reshape((len(data), sequence_length, len(feature_columns))).astype(np.float32)
+
+
+def prepare_labels(data, preprocess_data):
+    """
+    Label biner (1 = Berisiko) dari kolom target mentah beserta mask baris yang
+    labelnya dikenal: (labels, known); None jika kolom tidak ada.
+    Label numerik (1/0, 1.0/0.0, '1.0') maupun teks (Berisiko, Ya, ...) didukung;
+    label kosong atau di luar Berisiko/Tidak Berisiko ditandai known = False.
+    """
+    target_column = preprocess_data.get("target_column", "risiko_stunting")
+    if target_column not in data.columns:
+        return None
+    labels = data[target_column]
+    if pd.api.types.is_numeric_dtype(labels):
+        values = labels.to_numpy(dtype=np.float64)
+        return (values == 1.0).astype(np.int8), np.isin(values, [0.0, 1.0])
+
+    text = labels.astype(str).str.strip().str.replace(r'\.0+$', '', regex=True)
+    normalized = normalize_risk_labels(text.where(labels.notna()))
+    return (normalized == 'Berisiko').to_numpy().astype(np.int8), normalized.isin(VALID_LABELS).to_numpy()
+
+
+def unrolled_copy(model):
+    """
+    Salinan model dengan LSTM di-unroll. Loop LSTM dinamis (TensorList) tidak bisa
+    dikonversi ke TFLite; dengan sequence_length = 1 unroll tidak menambah komputasi.
+    """
+    from tensorflow import keras
+
+    config = model.get_config()
+    for layer in config["layers"]:
+        if layer["class_name"] == "LSTM":
+            layer["config"]["unroll"] = True
+
+    unrolled = keras.Sequential.from_config(config)
+    unrolled.set_weights(model.get_weights())
+    return unrolled
+
+
+def convert_model(model, variant, calibration_inputs=None):
+    """
+    Konversi model Keras ke TFLite.
+    - float16: bobot disimpan sebagai float16
+    - int8: bobot dan aktivasi int8, dikalibrasi dengan sampel fitur KRS yang sudah di-scale
+      (operasi yang tidak punya kernel int8 tetap berjalan float)
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(unrolled_copy(model))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        if calibration_inputs is None:
+            raise ValueError("Kuantisasi int8 membutuhkan sampel kalibrasi")
+
+        def representative_dataset():
+            for row in calibration_inputs:
+                yield [row[np.newaxis, ...]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS_INT8,
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+        ]
+    else:
+        raise ValueError(f"Varian kuantisasi tidak dikenal: {variant}")
+
+    return converter.convert()
+
+
+class TFLiteModel:
+    """
+    Pembungkus interpreter TFLite dengan antarmuka predict() seperti model Keras.
+    Satu instance dibagi semua sesi (st.cache_resource), sedangkan interpreter
+    tidak thread-safe: urutan resize -> set_tensor -> invoke -> get_tensor
+    dijalankan di bawah lock agar input/output antar sesi tidak tertukar.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        import tensorflow as tf
+
+        self.interpreter = tf.lite.Interpreter(model_path=str(model_path), num_threads=num_threads)
+        self.input_index = self.interpreter.get_input_details()[0]["index"]
+        self.output_index = self.interpreter.get_output_details()[0]["index"]
+        self.batch_size = None
+        self._lock = threading.Lock()
+
+    def predict(self, x, batch_size=1024, verbose=0):
+        """Prediksi probabilitas untuk input (batch, time_steps, fitur)"""
+        x = np.asarray(x, dtype=np.float32)
+        results = []
+        with self._lock:
+            for start in range(0, len(x), batch_size):
+                batch = x[start:start + batch_size]
+                if self.batch_size != len(batch):
+                    self.interpreter.resize_tensor_input(self.input_index, batch.shape)
+                    self.interpreter.allocate_tensors()
+                    self.batch_size = len(batch)
+                self.interpreter.set_tensor(self.input_index, batch)
+                self.interpreter.invoke()
+                results.append(self.interpreter.get_tensor(self.output_index).copy())
+        return np.concatenate(results, axis=0) if results else np.empty((0, 1), dtype=np.float32)
+
+
+def _timed_predict(model, inputs):
+    start = time.perf_counter()
+    scores = model.predict(inputs, verbose=0).reshape(-1)
+    return scores, time.perf_counter() - start
+
+
+def parity_report(reference_scores, scores, labels=None, threshold=0.5, known=None):
+    """
+    Akurasi dan tingkat kesepakatan model terkuantisasi terhadap model float32.
+    Akurasi hanya dihitung pada baris berlabel dikenal (mask known dari prepare_labels).
+    """
+    reference_pred = reference_scores >= threshold
+    pred = scores >= threshold
+    report = {
+        "agreement": float((reference_pred == pred).mean()),
+        "max_abs_diff": float(np.abs(reference_scores - scores).max()),
+        "mean_abs_diff": float(np.abs(reference_scores - scores).mean()),
+    }
+    if labels is not None:
+        known = np.ones(len(labels), dtype=bool) if known is None else known
+        if known.any():
+            report["accuracy_float32"] = float((reference_pred[known] == labels[known]).mean())
+            report["accuracy"] = float((pred[known] == labels[known]).mean())
+    return report
+
+
+def split_calibration(rows, sample_size, seed=42):
+    """
+    Membagi indeks holdout menjadi (kalibrasi, paritas) yang saling lepas.
+    Kalibrasi paling banyak setengah baris agar paritas tetap diukur pada data yang cukup.
+    """
+    if rows < 2:
+        raise ValueError("File holdout terlalu kecil untuk dibagi menjadi sampel kalibrasi dan paritas")
+    order = np.random.default_rng(seed).permutation(rows)
+    size = min(sample_size, rows // 2)
+    return np.sort(order[:size]), np.sort(order[size:])
+
+
+def quantize_all(holdout_path, sample_size=1000, seed=42, calibration_path=None):
+    """
+    Membuat varian int8/float16 untuk kedua model, lalu membandingkannya
+    dengan model float32 pada file holdout berlabel. Sampel kalibrasi int8
+    diambil dari calibration_path (mis. file training) atau dari potongan holdout
+    yang terpisah; paritas hanya diukur pada baris yang tidak dilihat konverter.
+    """
+    from tensorflow.keras.models import load_model
+
+    # Label dibaca mentah agar label numerik (1.0 / 0.0) tidak hilang saat dinormalisasi ke teks
+    holdout = read_dataset(holdout_path, normalize_labels=False)
+    if calibration_path:
+        calibration_data = read_dataset(calibration_path, normalize_labels=False)
+        rng = np.random.default_rng(seed)
+        calibration_data = calibration_data.iloc[
+            np.sort(rng.choice(len(calibration_data), size=min(sample_size, len(calibration_data)), replace=False))
+        ]
+        parity_data = holdout
+    else:
+        calibration_rows, parity_rows = split_calibration(len(holdout), sample_size, seed)
+        calibration_data = holdout.iloc[calibration_rows]
+        parity_data = holdout.iloc[parity_rows]
+
+    report = {
+        "holdout": str(holdout_path),
+        "rows": len(holdout),
+        "calibration_source": str(calibration_path or holdout_path),
+        "calibration_rows": len(calibration_data),
+        "parity_rows": len(parity_data),
+        "models": {},
+    }
+
+    for name, (model_path, pkl_path) in MODELS.items():
+        preprocess_data = load_preprocess(pkl_path)
+        inputs = prepare_features(parity_data, preprocess_data)
+        labels, known = prepare_labels(parity_data, preprocess_data) or (None, None)
+        calibration = prepare_features(calibration_data, preprocess_data)
+
+        model = load_model(model_path)
+        reference_scores, reference_seconds = _timed_predict(model, inputs)
+        model_report = {
+            "float32": {"size_bytes": os.path.getsize(model_path), "predict_seconds": reference_seconds},
+            "labels_dropped": 0 if known is None else int((~known).sum()),
+        }
+
+        for variant in VARIANTS:
+            output_path = quantized_model_path(model_path, variant)
+            with open(output_path, "wb") as file:
+                file.write(convert_model(model, variant, calibration))
+
+            scores, seconds = _timed_predict(TFLiteModel(output_path), inputs)
+            model_report[variant] = {
+                "path": output_path,
+                "size_bytes": os.path.getsize(output_path),
+                "predict_seconds": seconds,
+                **parity_report(reference_scores, scores, labels, known=known),
+            }
+
+        report["models"][name] = model_report
+
+    return report
+
+
+if __name__ == "__main__":
+    # Contoh: python quantization.py data_holdout_krs.xlsx --sample 1000
+    parser = argparse.ArgumentParser(description="Kuantisasi int8/float16 model LSTM risiko stunting")
+    parser.add_argument("holdout", help="File data berlabel (.xlsx/.csv) dengan kolom fitur KRS")
+    parser.add_argument("--sample", type=int, default=1000, help="Jumlah baris untuk kalibrasi int8")
+    parser.add_argument("--calibration", help="File data terpisah untuk kalibrasi int8 (mis. data training); "
+                                              "default: potongan holdout yang tidak dipakai untuk paritas")
+    parser.add_argument("--output", default=REPORT_PATH, help="File laporan paritas (JSON)")
+    args = parser.parse_args()
+
+    result = quantize_all(args.holdout, args.sample, calibration_path=args.calibration)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(result, file, indent=2)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,226 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from aggregation import KELURAHAN_LEVEL, WHO_THRESHOLD, classify_regions, region_counts
+
+# ===============================
+# Laporan per kecamatan/kelurahan (Excel + PDF)
+# ===============================
+REPORT_DIR = Path("laporan")
+
+
+def dataset_hash(content):
+    """Hash isi dataset (bytes) sebagai bagian kunci cache laporan"""
+    return hashlib.sha1(content).hexdigest()[:16]
+
+
+def _slug(value):
+    return re.sub(r'[^0-9A-Za-z]+', '_', str(value)).strip('_') or 'semua'
+
+
+def report_paths(data_hash, kecamatan, tahun, threshold=WHO_THRESHOLD, kelurahan=None):
+    """Lokasi file laporan untuk kunci (hash dataset, wilayah, tahun, threshold)"""
+    region = _slug(kecamatan) if kelurahan is None else f"{_slug(kecamatan)}__{_slug(kelurahan)}"
+    base = REPORT_DIR / data_hash / f"{region}_{_slug(tahun)}_t{threshold:g}"
+    return base.with_suffix('.xlsx'), base.with_suffix('.pdf')
+
+
+def _region_tables(aggregates, threshold):
+    """Tabel ringkasan kecamatan dan tabel status per kelurahan"""
+    kecamatan_counts = region_counts(aggregates, 'namakecamatan')
+    kecamatan_counts['status'] = classify_regions(kecamatan_counts, threshold)
+
+    if 'namakelurahan' in aggregates.columns:
+        kelurahan_counts = region_counts(aggregates, KELURAHAN_LEVEL)
+        kelurahan_counts['status'] = classify_regions(kelurahan_counts, threshold)
+        coords = aggregates.groupby(KELURAHAN_LEVEL, dropna=False, observed=True)[['lat_sum', 'lon_sum', 'coord_count']].sum()
+    else:
+        kelurahan_counts = kecamatan_counts.iloc[0:0]
+        coords = aggregates.groupby('namakecamatan', dropna=False, observed=True)[['lat_sum', 'lon_sum', 'coord_count']].sum()
+
+    coords = coords[coords['coord_count'] > 0]
+    points = pd.DataFrame({
+        'lat': coords['lat_sum'] / coords['coord_count'],
+        'lon': coords['lon_sum'] / coords['coord_count'],
+    })
+    return kecamatan_counts, kelurahan_counts, points
+
+
+def _render_map_image(points, statuses, title):
+    """Peta statis (PNG) titik kelurahan/kecamatan berwarna sesuai status, tanpa tile online"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(6, 5), dpi=120)
+    if not points.empty:
+        colors = np.where(statuses.reindex(points.index).to_numpy() == 'Aman', '#51cf66', '#ff6b6b')
+        ax.scatter(points['lon'], points['lat'], c=colors, s=120, edgecolors='white', linewidths=1.5)
+        for name, row in points.iterrows():
+            label = name[-1] if isinstance(name, tuple) else name
+            ax.annotate(str(label), (row['lon'], row['lat']), fontsize=7,
+                        xytext=(4, 4), textcoords='offset points')
+    ax.set_title(title, fontsize=11)
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    ax.grid(True, alpha=0.3)
+
+    buffer = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _write_pdf(path, title, kecamatan_counts, kelurahan_counts, map_png):
+    """PDF satu halaman: tabel statistik + peta statis"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    table = kelurahan_counts if not kelurahan_counts.empty else kecamatan_counts
+    table = table.reset_index()
+    table['persentase'] = table['persentase'].map(lambda value: f"{value:.1f}%")
+
+    with PdfPages(path) as pdf:
+        fig = plt.figure(figsize=(8.27, 11.69))
+        fig.suptitle(title, fontsize=14, fontweight='bold')
+
+        summary = kecamatan_counts[['total', 'berisiko', 'tidak_berisiko']].sum()
+        persentase = summary['berisiko'] / summary['total'] * 100 if summary['total'] > 0 else 0.0
+        fig.text(0.08, 0.93, (
+            f"Total keluarga: {int(summary['total']):,}   Berisiko: {int(summary['berisiko']):,} "
+            f"({persentase:.1f}%)   Tidak berisiko: {int(summary['tidak_berisiko']):,}"
+        ), fontsize=9)
+
+        map_ax = fig.add_axes([0.1, 0.5, 0.8, 0.4])
+        map_ax.imshow(plt.imread(io.BytesIO(map_png), format='png'))
+        map_ax.axis('off')
+
+        table_ax = fig.add_axes([0.05, 0.05, 0.9, 0.42])
+        table_ax.axis('off')
+        rendered = table_ax.table(cellText=table.astype(str).values, colLabels=list(table.columns),
+                                  loc='upper center', cellLoc='center')
+        rendered.auto_set_font_size(False)
+        rendered.set_fontsize(7)
+
+        pdf.savefig(fig)
+        plt.close(fig)
+
+
+def generate_region_report(aggregates, data_hash, kecamatan, tahun, threshold=WHO_THRESHOLD, kelurahan=None):
+    """
+    Membuat laporan Excel dan PDF untuk satu kecamatan (atau satu kelurahan di
+    kecamatan tersebut) dan tahun dari tabel agregat.
+    Dijalankan di worker proses terpisah; jika file sudah ada (cache), langsung dikembalikan.
+    """
+    excel_path, pdf_path = report_paths(data_hash, kecamatan, tahun, threshold, kelurahan)
+    if excel_path.exists() and pdf_path.exists():
+        return str(excel_path), str(pdf_path)
+
+    excel_path.parent.mkdir(parents=True, exist_ok=True)
+    region = f"Kecamatan {kecamatan}" if kelurahan is None else f"Kelurahan {kelurahan}, Kecamatan {kecamatan}"
+    title = f"Laporan Risiko Stunting - {region} - Tahun {tahun}"
+    kecamatan_counts, kelurahan_counts, points = _region_tables(aggregates, threshold)
+
+    statuses = kelurahan_counts['status'] if not kelurahan_counts.empty else kecamatan_counts['status']
+    map_png = _render_map_image(points, statuses, title)
+
+    # Tulis ke file sementara lalu rename agar laporan setengah jadi tidak terbaca sebagai cache
+    tmp_excel = excel_path.with_name(f".{os.getpid()}_{excel_path.name}")
+    with pd.ExcelWriter(tmp_excel, engine='openpyxl') as writer:
+        kecamatan_counts.reset_index().to_excel(writer, sheet_name='Ringkasan', index=False)
+        if not kelurahan_counts.empty:
+            kelurahan_counts.reset_index().to_excel(writer, sheet_name='Kelurahan', index=False)
+        pd.DataFrame({'keterangan': [f"Rentan Stunting jika persentase berisiko > {threshold:g}%"]}).to_excel(
+            writer, sheet_name='Threshold', index=False
+        )
+
+        from openpyxl.drawing.image import Image
+        sheet = writer.book.create_sheet('Peta')
+        sheet.add_image(Image(io.BytesIO(map_png)), 'A1')
+    os.replace(tmp_excel, excel_path)
+
+    tmp_pdf = pdf_path.with_name(f".{os.getpid()}_{pdf_path.name}")
+    _write_pdf(tmp_pdf, title, kecamatan_counts, kelurahan_counts, map_png)
+    os.replace(tmp_pdf, pdf_path)
+
+    return str(excel_path), str(pdf_path)
+
+
+class ReportManager:
+    """
+    Antrian job laporan di pool proses (satu worker per core).
+    Disimpan di st.cache_resource sehingga job tetap berjalan saat sesi Streamlit rerun,
+    dan job dengan kunci yang sama tidak dijalankan dua kali.
+    """
+
+    def __init__(self, max_workers=None):
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def _submit(self, key, region):
+        """Menjadwalkan satu job kecuali job dengan kunci sama sedang/sudah berhasil berjalan"""
+        data_hash, kecamatan, kelurahan, tahun, threshold = key
+        previous = self.jobs.get(key)
+        if previous is None or (previous.done() and previous.exception() is not None):
+            self.jobs[key] = self.executor.submit(
+                generate_region_report, region, data_hash, kecamatan, tahun, threshold, kelurahan
+            )
+
+    def submit_all(self, aggregates, data_hash, tahun='Semua', threshold=WHO_THRESHOLD, include_kelurahan=False):
+        """
+        Menjadwalkan laporan untuk setiap kecamatan (dan setiap kelurahan jika
+        include_kelurahan); mengembalikan daftar kunci job
+        (hash dataset, kecamatan, kelurahan/None, tahun, threshold).
+        """
+        if tahun != 'Semua' and 'tahun' in aggregates.columns:
+            aggregates = aggregates[aggregates['tahun'] == tahun]
+
+        keys = []
+        with self._lock:
+            for kecamatan, region in aggregates.groupby('namakecamatan', sort=True, observed=True):
+                key = (data_hash, kecamatan, None, tahun, threshold)
+                self._submit(key, region)
+                keys.append(key)
+
+            if include_kelurahan and 'namakelurahan' in aggregates.columns:
+                for (kecamatan, kelurahan), region in aggregates.groupby(KELURAHAN_LEVEL, sort=True, observed=True):
+                    key = (data_hash, kecamatan, kelurahan, tahun, threshold)
+                    self._submit(key, region)
+                    keys.append(key)
+        return keys
+
+    def progress(self, keys):
+        """(jumlah selesai, jumlah total, daftar error) untuk sekumpulan job"""
+        futures = [self.jobs[key] for key in keys if key in self.jobs]
+        done = [future for future in futures if future.done()]
+        errors = [str(future.exception()) for future in done if future.exception() is not None]
+        return len(done), len(futures), errors
+
+    def bundle(self, keys):
+        """ZIP berisi semua laporan yang sudah selesai untuk sekumpulan job"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for key in keys:
+                future = self.jobs.get(key)
+                if future is None or not future.done() or future.exception() is not None:
+                    continue
+                for path in future.result():
+                    archive.write(path, Path(path).name)
+        return buffer.getvalue()
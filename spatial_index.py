@@ -0,0 +1,309 @@
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from validation import CANONICAL_LOOKUP, _name_key
+
+# ===============================
+# Konfigurasi batas wilayah
+# ===============================
+# File batas wilayah tidak disertakan di repo (ukuran dan lisensi data). Unduh
+# batas administrasi Indonesia tingkat kecamatan (ADM3) dan kelurahan/desa (ADM4),
+# misalnya dataset "Indonesia - Subnational Administrative Boundaries" (COD-AB)
+# di HDX atau peta batas wilayah BIG, lalu simpan hanya feature Kabupaten Bogor
+# (3201) dan Kota Bogor (3271) sebagai GeoJSON (lon/lat, WGS84) di path berikut.
+# Tanpa file ini validasi koordinat dilewati dan posisi marker memakai median titik.
+KECAMATAN_BOUNDARY_PATH = 'assets/batas_kecamatan.geojson'
+KELURAHAN_BOUNDARY_PATH = 'assets/batas_kelurahan.geojson'
+
+# Nama properti GeoJSON yang umum dipakai untuk nama wilayah (BIG/BPS/HDX/OSM).
+# Dipisah per tingkat karena file kelurahan biasanya juga memuat nama kecamatan.
+KECAMATAN_NAME_PROPERTIES = [
+    'namakecamatan', 'nama_kecamatan', 'kecamatan', 'wadmkc', 'adm3_en', 'adm3_name',
+    'namobj', 'name'
+]
+KELURAHAN_NAME_PROPERTIES = [
+    'namakelurahan', 'nama_kelurahan', 'kelurahan', 'nama_desa', 'desa', 'wadmkd',
+    'adm4_en', 'adm4_name', 'namobj', 'name'
+]
+
+# Prefiks kelurahan/desa pada nama polygon (mis. "KEL. BARANANGSIANG", "DESA CIBANON")
+KELURAHAN_PREFIX = re.compile(r'^\s*(KELURAHAN|KEL\.|DESA)\s*')
+
+# Ukuran sel grid dalam derajat (~500 m di sekitar Bogor)
+DEFAULT_CELL_SIZE = 0.005
+
+
+def normalize_region_name(name):
+    """
+    Menyeragamkan penulisan nama wilayah untuk perbandingan: nama kecamatan
+    dipetakan ke nama kanonik validation.py (mis. "KEC. CIBINONG", "Darmaga"),
+    nama lain (kelurahan) menjadi huruf kapital tanpa prefiks dan tanda baca.
+    """
+    name = KELURAHAN_PREFIX.sub('', str(name).upper())
+    canonical = CANONICAL_LOOKUP.get(_name_key(name))
+    if canonical is not None:
+        return canonical
+    return ' '.join(re.sub(r'[^A-Z0-9]', ' ', name).split())
+
+
+def normalize_region_series(names):
+    """normalize_region_name untuk Series, hanya dihitung pada nilai unik"""
+    codes, uniques = pd.factorize(names)
+    normalized = np.array([normalize_region_name(value) for value in uniques] + [None], dtype=object)
+    return pd.Series(normalized[codes], index=names.index)
+
+
+def _feature_name(properties, name_property=None, name_properties=KECAMATAN_NAME_PROPERTIES):
+    """Mengambil nama wilayah dari properti sebuah feature GeoJSON"""
+    lowered = {str(key).lower(): value for key, value in (properties or {}).items()}
+    candidates = [name_property.lower()] if name_property else name_properties
+    for key in candidates:
+        if lowered.get(key) is not None:
+            return normalize_region_name(lowered[key])
+    return None
+
+
+def load_region_polygons(path, name_property=None, name_properties=KECAMATAN_NAME_PROPERTIES):
+    """
+    Membaca batas wilayah dari file GeoJSON lokal.
+    Mengembalikan list (nama_wilayah, [ring, ...]) dengan ring berupa array (n, 2) lon/lat.
+    Polygon dan MultiPolygon didukung; lubang (hole) ikut disimpan sebagai ring.
+    """
+    with open(path, encoding='utf-8') as file:
+        collection = json.load(file)
+
+    regions = []
+    for feature in collection.get('features', []):
+        geometry = feature.get('geometry') or {}
+        name = _feature_name(feature.get('properties'), name_property, name_properties)
+        if name is None:
+            continue
+
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+
+        rings = [
+            np.asarray(ring, dtype=np.float64)[:, :2]
+            for polygon in polygons
+            for ring in polygon
+            if len(ring) >= 3
+        ]
+        if rings:
+            regions.append((name, rings))
+
+    return regions
+
+
+def points_in_rings(lon, lat, rings):
+    """
+    Uji point-in-polygon (ray casting, aturan even-odd) secara vektor
+    untuk banyak titik sekaligus terhadap sekumpulan ring.
+    Titik diurutkan berdasarkan lat sekali, sehingga setiap tepi hanya
+    memeriksa potongan titik yang rentang lat-nya dilalui tepi tersebut.
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    order = np.argsort(lat, kind='stable')
+    sorted_lat = lat[order]
+    sorted_lon = lon[order]
+    parity = np.zeros(len(lat), dtype=bool)
+
+    for ring in rings:
+        ax, ay = ring[:, 0], ring[:, 1]
+        bx, by = np.roll(ax, -1), np.roll(ay, -1)
+        starts = np.searchsorted(sorted_lat, np.minimum(ay, by), side='left')
+        stops = np.searchsorted(sorted_lat, np.maximum(ay, by), side='left')
+
+        for edge in np.flatnonzero(stops > starts):
+            start, stop = starts[edge], stops[edge]
+            y = sorted_lat[start:stop]
+            x_cross = ax[edge] + (y - ay[edge]) * (bx[edge] - ax[edge]) / (by[edge] - ay[edge])
+            parity[start:stop] ^= sorted_lon[start:stop] < x_cross
+
+    inside = np.empty(len(lat), dtype=bool)
+    inside[order] = parity
+    return inside
+
+
+def polygon_centroid(rings):
+    """Centroid (berbobot luas) dari ring terluar terbesar sebuah wilayah"""
+    best_area, best_centroid = 0.0, None
+    for ring in rings:
+        x, y = ring[:, 0], ring[:, 1]
+        x2, y2 = np.roll(x, -1), np.roll(y, -1)
+        cross = x * y2 - x2 * y
+        area = cross.sum() / 2
+        if abs(area) > abs(best_area):
+            best_area = area
+            best_centroid = (
+                ((y + y2) * cross).sum() / (6 * area),
+                ((x + x2) * cross).sum() / (6 * area)
+            )
+    return best_centroid
+
+
+class RegionGridIndex:
+    """
+    Indeks grid untuk lookup titik -> wilayah.
+
+    Setiap sel grid diklasifikasikan saat build:
+    - sel interior: seluruh sel berada di dalam satu wilayah, titik langsung ditetapkan
+    - sel batas: dilalui tepi polygon, titik diuji dengan ray casting
+    Sebagian besar titik jatuh di sel interior sehingga lookup jutaan titik tetap cepat.
+    """
+
+    def __init__(self, regions, cell_size=DEFAULT_CELL_SIZE):
+        self.names = [name for name, _ in regions]
+        self.rings = [rings for _, rings in regions]
+        self.centroids = {name: polygon_centroid(rings) for name, rings in regions}
+        self.cell_size = cell_size
+
+        all_points = np.vstack([ring for rings in self.rings for ring in rings])
+        self.min_lon, self.min_lat = all_points.min(axis=0)
+        max_lon, max_lat = all_points.max(axis=0)
+        self.nx = int(np.ceil((max_lon - self.min_lon) / cell_size)) + 1
+        self.ny = int(np.ceil((max_lat - self.min_lat) / cell_size)) + 1
+
+        self.interior_owner = np.full(self.nx * self.ny, -1, dtype=np.int32)
+        self.boundary_cells = []
+
+        for region_id, rings in enumerate(self.rings):
+            self._index_region(region_id, rings)
+
+    def _cell_of(self, lon, lat):
+        ix = np.floor((np.asarray(lon) - self.min_lon) / self.cell_size).astype(np.int64)
+        iy = np.floor((np.asarray(lat) - self.min_lat) / self.cell_size).astype(np.int64)
+        return ix, iy
+
+    def _index_region(self, region_id, rings):
+        stacked = np.vstack(rings)
+        ix0, iy0 = self._cell_of(*stacked.min(axis=0))
+        ix1, iy1 = self._cell_of(*stacked.max(axis=0))
+
+        # Tandai sel yang dilalui tepi polygon (bbox tiap tepi)
+        boundary = np.zeros((iy1 - iy0 + 1, ix1 - ix0 + 1), dtype=bool)
+        for ring in rings:
+            ex0, ey0 = self._cell_of(np.minimum(ring[:, 0], np.roll(ring[:, 0], -1)),
+                                     np.minimum(ring[:, 1], np.roll(ring[:, 1], -1)))
+            ex1, ey1 = self._cell_of(np.maximum(ring[:, 0], np.roll(ring[:, 0], -1)),
+                                     np.maximum(ring[:, 1], np.roll(ring[:, 1], -1)))
+            for cx0, cy0, cx1, cy1 in zip(ex0, ey0, ex1, ey1):
+                boundary[cy0 - iy0:cy1 - iy0 + 1, cx0 - ix0:cx1 - ix0 + 1] = True
+
+        cell_y, cell_x = np.mgrid[iy0:iy1 + 1, ix0:ix1 + 1]
+        flat_cells = (cell_y * self.nx + cell_x).ravel()
+        boundary = boundary.ravel()
+
+        # Sel yang tidak dilalui tepi seluruhnya di dalam atau di luar: cukup uji titik tengahnya
+        center_lon = self.min_lon + (cell_x.ravel() + 0.5) * self.cell_size
+        center_lat = self.min_lat + (cell_y.ravel() + 0.5) * self.cell_size
+        candidates = ~boundary
+        inside = points_in_rings(center_lon[candidates], center_lat[candidates], rings)
+        self.interior_owner[flat_cells[candidates][inside]] = region_id
+
+        self.boundary_cells.append(np.sort(flat_cells[boundary]))
+
+    def lookup(self, lat, lon):
+        """
+        Mengembalikan nama wilayah untuk setiap titik (None jika di luar semua wilayah).
+        lat dan lon berupa array/Series dengan panjang sama.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        region_ids = np.full(len(lat), -1, dtype=np.int32)
+
+        ix, iy = self._cell_of(np.nan_to_num(lon, nan=-1e9), np.nan_to_num(lat, nan=-1e9))
+        in_grid = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        cells = np.where(in_grid, iy * self.nx + ix, -1)
+
+        region_ids[in_grid] = self.interior_owner[cells[in_grid]]
+
+        for region_id, boundary_cells in enumerate(self.boundary_cells):
+            pending = (region_ids == -1) & in_grid
+            if not pending.any() or len(boundary_cells) == 0:
+                continue
+            candidates = np.flatnonzero(pending)
+            candidates = candidates[np.isin(cells[candidates], boundary_cells, assume_unique=False)]
+            if len(candidates) == 0:
+                continue
+            inside = points_in_rings(lon[candidates], lat[candidates], self.rings[region_id])
+            region_ids[candidates[inside]] = region_id
+
+        names = np.array(self.names + [None], dtype=object)
+        return names[region_ids]
+
+
+def build_region_index(path=KECAMATAN_BOUNDARY_PATH, name_property=None, cell_size=DEFAULT_CELL_SIZE,
+                       name_properties=KECAMATAN_NAME_PROPERTIES):
+    """Membangun indeks wilayah dari file GeoJSON; None jika file batas tidak tersedia"""
+    if not Path(path).exists():
+        return None
+    regions = load_region_polygons(path, name_property, name_properties)
+    if not regions:
+        return None
+    return RegionGridIndex(regions, cell_size)
+
+
+def build_kelurahan_index(path=KELURAHAN_BOUNDARY_PATH, name_property=None, cell_size=DEFAULT_CELL_SIZE):
+    """Indeks grid batas kelurahan/desa; None jika file batas tidak tersedia"""
+    return build_region_index(path, name_property, cell_size, KELURAHAN_NAME_PROPERTIES)
+
+
+def validate_region_column(df, index, column='namakecamatan'):
+    """
+    Menetapkan wilayah hasil lookup koordinat dan memvalidasinya
+    terhadap nama wilayah yang tertulis pada kolom `column`.
+    Mengembalikan (wilayah_terdeteksi, mask_valid).
+    """
+    detected = pd.Series(index.lookup(df['lat'], df['lon']), index=df.index)
+    stated = normalize_region_series(df[column])
+    valid = detected.notna() & (detected == stated)
+    return detected, valid
+
+
+def assign_kelurahan(df, index, column='namakelurahan'):
+    """
+    Menetapkan kelurahan dari koordinat untuk setiap baris.
+    Kolom `column` yang kosong diisi nama hasil lookup; baris yang sudah
+    terisi tetap dipertahankan dan divalidasi seperti kolom kecamatan.
+    Mengembalikan (kelurahan_terisi, kelurahan_terdeteksi, mask_valid).
+    """
+    detected = pd.Series(index.lookup(df['lat'], df['lon']), index=df.index)
+    if column not in df.columns:
+        return detected, detected, detected.notna()
+
+    stated = df[column]
+    valid = detected.notna() & (detected == normalize_region_series(stated))
+    return stated.where(stated.notna(), detected), detected, valid
+
+
+def robust_centroids(df, valid_mask=None, index=None):
+    """
+    Koordinat marker per kecamatan yang tahan outlier:
+    median lat/lon dari titik yang valid; jika tidak ada titik valid
+    dan batas wilayah tersedia, gunakan centroid polygon.
+    """
+    points = df.dropna(subset=['lat', 'lon'])
+    if valid_mask is not None:
+        points = points[valid_mask.reindex(points.index, fill_value=False)]
+
+    map_data = points.groupby('namakecamatan', observed=True).agg({
+        'lat': 'median',
+        'lon': 'median'
+    })
+
+    if index is not None:
+        for kecamatan in df['namakecamatan'].dropna().unique():
+            centroid = index.centroids.get(normalize_region_name(kecamatan))
+            if kecamatan not in map_data.index and centroid is not None:
+                map_data.loc[kecamatan] = centroid
+
+    return map_data.rename_axis('namakecamatan').reset_index()
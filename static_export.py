@@ -0,0 +1,301 @@
+import argparse
+import hashlib
+import html
+import json
+import re
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from aggregation import (
+    WHO_THRESHOLD,
+    aggregate_file,
+    filter_aggregates,
+    kecamatan_stats_from_aggregates,
+    map_points_from_aggregates,
+)
+from figures import build_map, risk_bar_figure
+from spatial_index import KECAMATAN_BOUNDARY_PATH, build_region_index
+
+# ===============================
+# Ekspor dashboard statis (HTML) untuk distribusi offline
+# ===============================
+# Setiap kombinasi filter (kecamatan x tahun) menjadi satu halaman HTML berisi
+# metrik Home, diagram batang dan peta folium. Data sudah dihitung, icon marker
+# disematkan base64, plotly.js disalin sekali ke direktori bundle, dan JS/CSS
+# peta (Leaflet, jQuery, Bootstrap, awesome-markers) diunduh sekali ke vendor/,
+# sehingga bundle dapat dibuka tanpa proses Streamlit maupun CDN. Hanya tile
+# peta dasar (OpenStreetMap) yang tetap butuh koneksi internet. Jika aset tidak
+# dapat diunduh saat ekspor, halaman memakai URL CDN (butuh internet saat dibuka).
+EXPORT_DIR = Path("dashboard_statis")
+MANIFEST_NAME = "manifest.json"
+VENDOR_DIR = "vendor"
+META_SCRIPT = "export_meta.js"
+# Naikkan jika template halaman berubah agar semua halaman dibangun ulang
+TEMPLATE_VERSION = 2
+DOWNLOAD_TIMEOUT = 30
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="id">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="plotly.min.js"></script>
+<script src="{meta_script}"></script>
+<style>
+    body {{ font-family: 'Poppins', Arial, sans-serif; margin: 0 auto; max-width: 1200px; padding: 1.5rem; color: #2c3e50; }}
+    .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); padding: 2rem; border-radius: 12px; color: white; text-align: center; }}
+    .cards {{ display: flex; gap: 1rem; flex-wrap: wrap; margin: 1.5rem 0; }}
+    .card {{ flex: 1; min-width: 180px; background: #f8f9fa; padding: 1.5rem; border-radius: 10px; text-align: center; border-left: 5px solid #007bff; }}
+    .card h2 {{ margin: 0; font-size: 2.2rem; }}
+    .card p {{ margin: 0.5rem 0 0 0; color: #6c757d; font-weight: 600; }}
+    iframe {{ width: 100%; height: 600px; border: 1px solid #ddd; border-radius: 10px; }}
+    a {{ color: #667eea; }}
+</style>
+</head>
+<body>
+<div class="header">
+    <h1>Dashboard Keluarga Rentan Stunting - Kota Bogor</h1>
+    <p>Kecamatan: <b>{kecamatan}</b> &middot; Tahun: <b>{tahun}</b> &middot; Threshold: <b>{threshold:g}%</b></p>
+</div>
+<p><a href="index.html">&larr; Daftar wilayah</a> &middot; Data per <span id="generated-at">{generated_at}</span></p>
+<script>if (window.KRS_EXPORT) document.getElementById('generated-at').textContent = window.KRS_EXPORT.generated_at;</script>
+<h3>Indikator Utama</h3>
+<div class="cards">
+    <div class="card"><h2 style="color: #007bff;">{total:,}</h2><p>Total Keluarga</p></div>
+    <div class="card" style="border-left-color: #28a745;"><h2 style="color: #28a745;">{low_risk:,}</h2><p>Tidak Berisiko ({low_pct:.1f}%)</p></div>
+    <div class="card" style="border-left-color: #dc3545;"><h2 style="color: #dc3545;">{high_risk:,}</h2><p>Berisiko ({high_pct:.1f}%)</p></div>
+    <div class="card" style="border-left-color: #43e97b;"><h2 style="color: #28a745;">{jumlah_aman}</h2><p>Kecamatan Aman</p></div>
+    <div class="card" style="border-left-color: #fa709a;"><h2 style="color: #dc3545;">{jumlah_rentan}</h2><p>Kecamatan Rentan</p></div>
+</div>
+<h3>Distribusi Risiko Stunting</h3>
+{chart}
+<h3>Peta Keluarga Rentan Stunting</h3>
+{map}
+</body>
+</html>
+"""
+
+
+def _slug(value):
+    return re.sub(r'[^0-9A-Za-z]+', '_', str(value)).strip('_').lower() or 'semua'
+
+
+def _tahun_label(value):
+    if value == 'Semua':
+        return value
+    value = float(value)
+    return str(int(value)) if value.is_integer() else str(value)
+
+
+def page_name(kecamatan, tahun):
+    return f"{_slug(kecamatan)}_{_slug(_tahun_label(tahun))}.html"
+
+
+def filter_combinations(aggregates):
+    """Semua kombinasi (kecamatan, tahun) termasuk 'Semua' untuk masing-masing filter"""
+    kecamatan_values = ['Semua'] + sorted(aggregates['namakecamatan'].dropna().unique())
+    if 'tahun' in aggregates.columns:
+        tahun_values = ['Semua'] + sorted(aggregates['tahun'].dropna().unique(), reverse=True)
+    else:
+        tahun_values = ['Semua']
+    return [(kecamatan, tahun) for kecamatan in kecamatan_values for tahun in tahun_values]
+
+
+def content_hash(filtered, threshold, assets=None):
+    """
+    Sidik jari data satu halaman: tabel agregat terfilter + threshold + versi template
+    + aset yang sudah disalin ke vendor/. Halaman hanya dibangun ulang bila sidik jarinya berubah.
+    """
+    ordered = filtered.sort_values([column for column in ['namakecamatan', 'namakelurahan', 'tahun']
+                                    if column in filtered.columns]).reset_index(drop=True)
+    digest = hashlib.sha1(pd.util.hash_pandas_object(ordered, index=False).to_numpy().tobytes())
+    digest.update(f"{threshold}|{TEMPLATE_VERSION}|{sorted((assets or {}).items())}".encode())
+    return digest.hexdigest()
+
+
+def _asset_urls(html_text):
+    """URL JS/CSS eksternal yang dimuat sebuah halaman folium"""
+    return sorted(set(re.findall(r'(?:src|href)="(https?://[^"]+?\.(?:js|css))"', html_text)))
+
+
+def _vendor_name(url):
+    return re.sub(r'[^0-9A-Za-z.@-]+', '_', url.split('://', 1)[1])
+
+
+def vendor_assets(output_dir):
+    """
+    Mengunduh JS/CSS yang dipakai peta folium sekali ke output_dir/vendor
+    (file yang sudah ada tidak diunduh ulang). Mengembalikan mapping
+    URL CDN -> path relatif lokal untuk aset yang tersedia.
+    """
+    import folium
+
+    sample = folium.Map(location=[0, 0])
+    folium.Marker([0, 0], icon=folium.Icon(), popup=folium.Popup("-")).add_to(folium.FeatureGroup().add_to(sample))
+
+    vendor_dir = Path(output_dir) / VENDOR_DIR
+    vendor_dir.mkdir(parents=True, exist_ok=True)
+    assets, failed = {}, []
+    for url in _asset_urls(sample.get_root().render()):
+        target = vendor_dir / _vendor_name(url)
+        if not target.exists():
+            try:
+                with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+                    target.write_bytes(response.read())
+            except OSError:
+                failed.append(url)
+                continue
+        assets[url] = f"{VENDOR_DIR}/{target.name}"
+
+    if failed:
+        print(f"Peringatan: {len(failed)} aset peta tidak dapat diunduh; halaman memakai CDN untuk: "
+              + ", ".join(failed))
+    return assets
+
+
+def localize_assets(html_text, assets):
+    """Mengganti URL CDN pada HTML dengan salinan lokal di vendor/"""
+    for url, local in assets.items():
+        html_text = html_text.replace(f'"{url}"', f'"{local}"')
+    return html_text
+
+
+def _write_meta_script(output_dir, generated_at):
+    """
+    Waktu ekspor terakhir untuk semua halaman. Halaman yang dilewati (tidak berubah)
+    membaca file ini sehingga keterangan "Data per" selalu sama dengan ekspor terakhir.
+    """
+    (Path(output_dir) / META_SCRIPT).write_text(
+        f"window.KRS_EXPORT = {json.dumps({'generated_at': generated_at})};\n", encoding="utf-8"
+    )
+
+
+def render_page(filtered, kecamatan, tahun, threshold, generated_at, assets=None):
+    """HTML satu kombinasi filter dari tabel agregat yang sudah difilter"""
+    total = int(filtered['total'].sum())
+    high_risk = int(filtered['berisiko'].sum())
+    low_risk = int(filtered['tidak_berisiko'].sum())
+    stats = {'total': total, 'high_risk': high_risk, 'low_risk': low_risk}
+
+    kecamatan_stats = kecamatan_stats_from_aggregates(filtered, threshold)
+    jumlah_aman = sum(1 for s in kecamatan_stats.values() if s['status'] == 'Aman')
+
+    chart = risk_bar_figure(stats).to_html(full_html=False, include_plotlyjs=False)
+
+    map_data, center = map_points_from_aggregates(filtered)
+    map_obj = build_map(map_data, center, kecamatan_stats, threshold, inline_icons=True)
+    if map_obj is None:
+        map_html = "<p>Tidak dapat menampilkan peta. Data koordinat tidak tersedia.</p>"
+    else:
+        map_document = localize_assets(map_obj.get_root().render(), assets or {})
+        map_html = f'<iframe srcdoc="{html.escape(map_document)}"></iframe>'
+
+    return PAGE_TEMPLATE.format(
+        title=html.escape(f"Risiko Stunting - {kecamatan} - {_tahun_label(tahun)}"),
+        meta_script=META_SCRIPT,
+        kecamatan=html.escape(str(kecamatan)),
+        tahun=_tahun_label(tahun),
+        threshold=threshold,
+        generated_at=generated_at,
+        total=total,
+        low_risk=low_risk,
+        high_risk=high_risk,
+        low_pct=low_risk / total * 100 if total else 0.0,
+        high_pct=high_risk / total * 100 if total else 0.0,
+        jumlah_aman=jumlah_aman,
+        jumlah_rentan=len(kecamatan_stats) - jumlah_aman,
+        chart=chart,
+        map=map_html,
+    )
+
+
+def render_index(entries, generated_at):
+    """Halaman daftar semua kombinasi filter"""
+    rows = "\n".join(
+        f'<li><a href="{entry["file"]}">{html.escape(str(entry["kecamatan"]))} &middot; {entry["tahun"]}</a></li>'
+        for entry in entries
+    )
+    return (
+        '<!DOCTYPE html><html lang="id"><head><meta charset="utf-8">'
+        '<title>Dashboard Keluarga Rentan Stunting</title></head>'
+        '<body style="font-family: Arial, sans-serif; max-width: 900px; margin: 2rem auto;">'
+        f'<h1>Dashboard Keluarga Rentan Stunting - Kota Bogor</h1><p>Data per {generated_at}</p>'
+        f'<ul>{rows}</ul></body></html>'
+    )
+
+
+def _write_plotly_js(output_dir):
+    """Menyalin plotly.min.js sekali ke bundle (dipakai bersama semua halaman)"""
+    target = output_dir / "plotly.min.js"
+    if not target.exists():
+        from plotly.offline import get_plotlyjs
+        target.write_text(get_plotlyjs(), encoding="utf-8")
+
+
+def export_static(data_path, output_dir=EXPORT_DIR, threshold=WHO_THRESHOLD, force=False):
+    """
+    Membangun bundle HTML statis secara inkremental: hanya halaman yang sidik jari
+    datanya berubah (atau belum ada) yang dirender ulang. Mengembalikan
+    (jumlah halaman dibangun, jumlah halaman dilewati).
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+    manifest = {} if force or not manifest_path.exists() else json.loads(manifest_path.read_text(encoding="utf-8"))
+    pages = manifest.get('pages', {})
+
+    region_index = build_region_index()
+    if region_index is None:
+        print(f"Peringatan: {KECAMATAN_BOUNDARY_PATH} tidak ditemukan; koordinat tidak divalidasi "
+              "terhadap batas kecamatan")
+    aggregates = aggregate_file(data_path, region_index=region_index)
+    generated_at = datetime.now().strftime("%d-%m-%Y %H:%M")
+    _write_plotly_js(output_dir)
+    _write_meta_script(output_dir, generated_at)
+    assets = vendor_assets(output_dir)
+
+    built, skipped, entries, current_pages = 0, 0, [], {}
+    for kecamatan, tahun in filter_combinations(aggregates):
+        filtered = filter_aggregates(aggregates, kecamatan, tahun)
+        if filtered.empty:
+            continue
+
+        file_name = page_name(kecamatan, tahun)
+        fingerprint = content_hash(filtered, threshold, assets)
+        entries.append({'file': file_name, 'kecamatan': kecamatan, 'tahun': _tahun_label(tahun)})
+        current_pages[file_name] = fingerprint
+
+        if pages.get(file_name) == fingerprint and (output_dir / file_name).exists():
+            skipped += 1
+            continue
+
+        (output_dir / file_name).write_text(
+            render_page(filtered, kecamatan, tahun, threshold, generated_at, assets), encoding="utf-8"
+        )
+        built += 1
+
+    # Halaman untuk kombinasi yang tidak ada lagi di data dihapus
+    for stale in set(pages) - set(current_pages):
+        (output_dir / stale).unlink(missing_ok=True)
+
+    (output_dir / "index.html").write_text(render_index(entries, generated_at), encoding="utf-8")
+    manifest_path.write_text(json.dumps({
+        'source': str(data_path), 'threshold': threshold, 'pages': current_pages
+    }, indent=2), encoding="utf-8")
+    return built, skipped
+
+
+if __name__ == "__main__":
+    # Contoh: python static_export.py penelitian_bersih.xlsx --output dashboard_statis
+    parser = argparse.ArgumentParser(description="Ekspor dashboard risiko stunting ke HTML statis")
+    parser.add_argument("data", help="File data (.xlsx/.csv) tingkat rumah tangga")
+    parser.add_argument("--output", default=str(EXPORT_DIR))
+    parser.add_argument("--threshold", type=float, default=WHO_THRESHOLD)
+    parser.add_argument("--force", action="store_true", help="Bangun ulang semua halaman")
+    args = parser.parse_args()
+
+    built, skipped = export_static(args.data, args.output, args.threshold, args.force)
+    print(f"{built} halaman dibangun, {skipped} halaman tidak berubah (dilewati) di {args.output}")
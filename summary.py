@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from dataset_refresh import file_signature, normalize_risk_labels, read_dataset
+
+# ===============================
+# Snapshot ringkasan risiko stunting
+# ===============================
+# Satu snapshot per file sumber, disimpan di sebelahnya:
+# penelitian_bersih.xlsx -> penelitian_bersih.ringkasan.json
+SUMMARY_SUFFIX = ".ringkasan.json"
+
+
+def summary_path(source):
+    """Lokasi snapshot ringkasan milik file data `source`"""
+    source = Path(source)
+    return str(source.with_name(source.with_suffix('').name + SUMMARY_SUFFIX))
+
+
+def count_risk(labels):
+    """Menghitung total / berisiko / tidak berisiko dari Series label yang sudah dinormalisasi"""
+    counts = labels.value_counts()
+    return {
+        'total': int(len(labels)),
+        'high_risk': int(counts.get('Berisiko', 0)),
+        'low_risk': int(counts.get('Tidak Berisiko', 0))
+    }
+
+
+def _group_counts(df, keys):
+    """Counter risiko per grup, diurutkan berdasarkan kunci grup"""
+    groups = []
+    for values, group in df.groupby(keys, sort=True, observed=True):
+        values = values if isinstance(values, tuple) else (values,)
+        entry = {key: _json_value(value) for key, value in zip(keys, values)}
+        entry.update(count_risk(group['risiko_stunting']))
+        groups.append(entry)
+    return groups
+
+
+def _json_value(value):
+    """Konversi nilai numpy/pandas ke tipe JSON (tahun float -> int)"""
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return value
+
+
+def build_summary(df, source=None):
+    """
+    Membentuk ringkasan kecil dari data tingkat rumah tangga:
+    counter risiko keseluruhan, per kecamatan, per tahun, dan per (kecamatan, tahun).
+    """
+    df = df.copy()
+    df['risiko_stunting'] = normalize_risk_labels(df['risiko_stunting'])
+
+    summary = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'source': str(source) if source else None,
+        'source_signature': list(file_signature(source)) if source and Path(source).exists() else None,
+        'overall': count_risk(df['risiko_stunting']),
+        'per_kecamatan': [],
+        'per_tahun': [],
+        'per_kecamatan_tahun': []
+    }
+
+    if 'namakecamatan' in df.columns:
+        summary['per_kecamatan'] = _group_counts(df, ['namakecamatan'])
+    if 'tahun' in df.columns:
+        summary['per_tahun'] = _group_counts(df, ['tahun'])
+    if 'namakecamatan' in df.columns and 'tahun' in df.columns:
+        summary['per_kecamatan_tahun'] = _group_counts(df, ['namakecamatan', 'tahun'])
+
+    return summary
+
+
+def write_summary(summary, path):
+    """Menyimpan snapshot ringkasan ke file JSON (ditulis ke file sementara lalu diganti)"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def _same_file(first, second):
+    return Path(first).resolve() == Path(second).resolve()
+
+
+def load_summary(path, expected_source=None):
+    """
+    Membaca snapshot ringkasan. Mengembalikan None jika file tidak ada,
+    snapshot dibuat dari file lain selain expected_source, file sumbernya
+    sudah tidak ada, atau file sumbernya sudah berubah sejak snapshot dibuat.
+    """
+    if not Path(path).exists():
+        return None
+
+    with open(path, encoding='utf-8') as file:
+        summary = json.load(file)
+
+    source = summary.get('source')
+    signature = summary.get('source_signature')
+    if expected_source is not None and not (source and _same_file(source, expected_source)):
+        return None
+    if source:
+        if not Path(source).exists() or signature is None:
+            return None
+        if list(file_signature(source)) != signature:
+            return None
+
+    return summary
+
+
+if __name__ == "__main__":
+    # Contoh: python summary.py penelitian_bersih.xlsx  (-> penelitian_bersih.ringkasan.json)
+    if len(sys.argv) < 2:
+        print("Penggunaan: python summary.py <file_data> [file_ringkasan]")
+        sys.exit(1)
+
+    data_path = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else summary_path(data_path)
+    write_summary(build_summary(read_dataset(data_path), source=data_path), output_path)
+    print(f"Ringkasan disimpan ke {output_path}")
@@ -0,0 +1,204 @@
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from dataset_refresh import normalize_risk_labels, read_excel_sheets
+
+# ===============================
+# Validasi kualitas data KRS (satu pass vektorisasi)
+# ===============================
+REJECTION_PATH = "data_ditolak.csv"
+
+# Kotak batas Kabupaten + Kota Bogor (derajat, dengan sedikit margin)
+BOGOR_BOUNDS = {
+    'lat_min': -6.95, 'lat_max': -6.25,
+    'lon_min': 106.35, 'lon_max': 107.25,
+}
+TAHUN_MIN = 2000
+
+VALID_LABELS = ['Berisiko', 'Tidak Berisiko']
+
+# Nama kanonik kecamatan Kabupaten Bogor (3201) dan Kota Bogor (3271)
+CANONICAL_KECAMATAN = [
+    'BABAKAN MADANG', 'BOJONGGEDE', 'CARINGIN', 'CARIU', 'CIAMPEA', 'CIAWI',
+    'CIBINONG', 'CIBUNGBULANG', 'CIGOMBONG', 'CIGUDEG', 'CIJERUK', 'CILEUNGSI',
+    'CIOMAS', 'CISARUA', 'CISEENG', 'CITEUREUP', 'DRAMAGA', 'GUNUNG PUTRI',
+    'GUNUNG SINDUR', 'JASINGA', 'JONGGOL', 'KEMANG', 'KLAPANUNGGAL', 'LEUWILIANG',
+    'LEUWISADENG', 'MEGAMENDUNG', 'NANGGUNG', 'PAMIJAHAN', 'PARUNG', 'PARUNG PANJANG',
+    'RANCABUNGUR', 'RUMPIN', 'SUKAJAYA', 'SUKAMAKMUR', 'SUKARAJA', 'TAJURHALANG',
+    'TAMANSARI', 'TANJUNGSARI', 'TENJO', 'TENJOLAYA',
+    'BOGOR BARAT', 'BOGOR SELATAN', 'BOGOR TENGAH', 'BOGOR TIMUR', 'BOGOR UTARA',
+    'TANAH SAREAL',
+]
+
+# Ejaan alternatif yang sering muncul di data lapangan
+KECAMATAN_ALIASES = {
+    'DARMAGA': 'DRAMAGA',
+    'TANAHSEREAL': 'TANAH SAREAL',
+    'GNPUTRI': 'GUNUNG PUTRI',
+    'GNSINDUR': 'GUNUNG SINDUR',
+    'BABAKANMADANG': 'BABAKAN MADANG',
+}
+
+# Kode alasan penolakan (bit flag; satu baris bisa punya beberapa alasan)
+REASON_CODES = [
+    'KOORDINAT_KOSONG',
+    'KOORDINAT_DI_LUAR_BOGOR',
+    'TAHUN_TIDAK_VALID',
+    'KECAMATAN_TIDAK_DIKENAL',
+    'KELURAHAN_KOSONG',
+    'LABEL_TIDAK_VALID',
+    'DUPLIKAT',
+]
+
+# Kolom ID keluarga/rumah tangga (setelah normalisasi nama kolom). Jika ada, duplikat
+# ditentukan dari ID ini; jika tidak, dari seluruh kolom baris asli.
+RECORD_ID_COLUMNS = ['id_keluarga', 'kode_keluarga', 'id_rumah_tangga', 'no_kk', 'nomor_kk']
+
+
+def _name_key(name):
+    """Kunci pencocokan nama: huruf kapital tanpa prefiks 'KEC.' dan tanpa spasi/tanda baca"""
+    name = re.sub(r'^\s*(KECAMATAN|KEC\.?)\s*', '', str(name).upper())
+    return re.sub(r'[^A-Z]', '', name)
+
+
+CANONICAL_LOOKUP = {_name_key(name): name for name in CANONICAL_KECAMATAN}
+CANONICAL_LOOKUP.update(KECAMATAN_ALIASES)
+
+
+def _map_unique(series, func):
+    """
+    Menerapkan func hanya pada nilai unik (jumlahnya kecil) lalu menyebarkan
+    hasilnya sebagai Categorical, sehingga hashing duplikat cukup memakai kode integer.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    mapped = pd.Categorical([func(value) for value in uniques])
+    mapped_codes = np.append(mapped.codes, -1).astype(np.int32)
+    return pd.Series(
+        pd.Categorical.from_codes(mapped_codes[codes], categories=mapped.categories),
+        index=series.index
+    )
+
+
+def canonical_kecamatan(names):
+    """Nama kecamatan kanonik (None jika tidak dikenal)"""
+    return _map_unique(names, lambda name: CANONICAL_LOOKUP.get(_name_key(name)))
+
+
+def _clean_label(value):
+    # Label numerik dari Excel (1.0 / 0.0) disamakan dengan '1' / '0'
+    text = re.sub(r'\.0+$', '', str(value).strip())
+    return normalize_risk_labels(pd.Series([text])).iloc[0]
+
+
+def duplicate_rows(df):
+    """
+    Mask baris rumah tangga duplikat (kemunculan pertama dipertahankan), dihitung
+    pada data asli sebelum kolom dibuang: berdasarkan kolom ID keluarga bila ada,
+    selain itu hash seluruh kolom. Keluarga berbeda yang kebetulan berbagi lokasi,
+    wilayah, tahun dan label tidak dianggap duplikat.
+    """
+    id_columns = [column for column in RECORD_ID_COLUMNS if column in df.columns]
+    if id_columns:
+        keys = df[id_columns]
+        return keys.duplicated() & keys.notna().all(axis=1)
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    return pd.Series(hashes.duplicated().to_numpy(), index=df.index)
+
+
+def validate_dataset(df, bounds=BOGOR_BOUNDS, tahun_max=None, duplicates=None):
+    """
+    Memvalidasi seluruh baris sekaligus (tanpa loop per baris).
+
+    Aturan: koordinat numerik dan di dalam kotak batas Bogor, tahun valid,
+    nama kecamatan ada di kamus kanonik, kelurahan terisi, label risiko
+    termasuk whitelist, dan baris rumah tangga tidak duplikat.
+
+    duplicates: mask duplikat dari duplicate_rows() pada data asli (seluruh kolom)
+    sebelum proyeksi kolom; jika None dihitung dari df apa adanya.
+
+    Mengembalikan (data_bersih, data_ditolak). data_ditolak berisi nilai asli
+    beserta kolom 'alasan' (kode alasan dipisah ';').
+    """
+    tahun_max = tahun_max or datetime.now().year + 1
+
+    lat = pd.to_numeric(df['lat'], errors='coerce')
+    lon = pd.to_numeric(df['lon'], errors='coerce')
+    tahun = pd.to_numeric(df['tahun'], errors='coerce')
+    kecamatan = canonical_kecamatan(df['namakecamatan'])
+    kelurahan = _map_unique(
+        df['namakelurahan'],
+        lambda name: re.sub(r'\s+', ' ', str(name)).strip().upper() or None
+    )
+    labels = _map_unique(df['risiko_stunting'], _clean_label)
+
+    missing_coords = lat.isna() | lon.isna()
+    checks = {
+        'KOORDINAT_KOSONG': missing_coords,
+        'KOORDINAT_DI_LUAR_BOGOR': ~missing_coords & ~(
+            lat.between(bounds['lat_min'], bounds['lat_max'])
+            & lon.between(bounds['lon_min'], bounds['lon_max'])
+        ),
+        'TAHUN_TIDAK_VALID': ~tahun.between(TAHUN_MIN, tahun_max) | (tahun % 1 != 0),
+        'KECAMATAN_TIDAK_DIKENAL': kecamatan.isna(),
+        'KELURAHAN_KOSONG': kelurahan.isna(),
+        'LABEL_TIDAK_VALID': ~labels.isin(VALID_LABELS),
+    }
+
+    normalized = pd.DataFrame({
+        'lat': lat, 'lon': lon,
+        'namakelurahan': kelurahan, 'namakecamatan': kecamatan,
+        'tahun': tahun, 'risiko_stunting': labels,
+    }, index=df.index)
+    if duplicates is None:
+        duplicates = duplicate_rows(df)
+    checks['DUPLIKAT'] = duplicates.reindex(df.index, fill_value=False)
+
+    flags = np.zeros(len(df), dtype=np.int16)
+    for bit, code in enumerate(REASON_CODES):
+        flags |= checks[code].to_numpy(dtype=bool).astype(np.int16) << bit
+
+    rejected_mask = flags != 0
+    clean = normalized[~rejected_mask].copy()
+    clean['tahun'] = clean['tahun'].astype(int)
+    for column in ['namakelurahan', 'namakecamatan', 'risiko_stunting']:
+        clean[column] = clean[column].astype(object)
+
+    rejected = df[rejected_mask].copy()
+    rejected['alasan'] = _reason_text(flags[rejected_mask])
+
+    return clean, rejected
+
+
+def _reason_text(flags):
+    """Bit flag -> teks kode alasan; hanya dihitung untuk kombinasi unik"""
+    unique_flags, inverse = np.unique(flags, return_inverse=True)
+    texts = np.array([
+        ';'.join(code for bit, code in enumerate(REASON_CODES) if value & (1 << bit))
+        for value in unique_flags
+    ], dtype=object)
+    return texts[inverse]
+
+
+def rejection_summary(rejected):
+    """Jumlah baris ditolak per kode alasan"""
+    if rejected.empty:
+        return pd.Series(dtype=int)
+    return rejected['alasan'].str.split(';').explode().value_counts()
+
+
+if __name__ == "__main__":
+    # Contoh: python validation.py dataset_stunting_preprocessed.xlsx data_ditolak.csv
+    if len(sys.argv) < 2:
+        print("Penggunaan: python validation.py <file_data> [file_ditolak]")
+        sys.exit(1)
+
+    from preprocessing import process_drop_columns_with_year
+
+    data_path = sys.argv[1]
+    rejection_path = sys.argv[2] if len(sys.argv) > 2 else REJECTION_PATH
+    data = pd.read_csv(data_path) if data_path.lower().endswith('.csv') else read_excel_sheets(data_path)
+    process_drop_columns_with_year(data, rejection_path=rejection_path)
@@ -0,0 +1,118 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from dataset_refresh import SPLIT_SHEET_MARKER, read_excel_sheets
+
+# ===============================
+# Output stage hasil preprocessing
+# ===============================
+# Batas baris XLSX adalah 1.048.576 termasuk header
+XLSX_MAX_ROWS = 1_048_576 - 1
+WRITE_CHUNK_SIZE = 100_000
+
+
+def write_parquet(df, output_path):
+    """Parquet (kolumnar, terkompresi); membutuhkan pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as error:
+        raise ImportError("Format parquet membutuhkan paket 'pyarrow' (pip install pyarrow)") from error
+    df.to_parquet(output_path, index=False, compression='zstd')
+
+
+def write_csv(df, output_path):
+    """CSV; kompresi mengikuti ekstensi (.csv.gz, .csv.zst, .csv.bz2, ...)"""
+    df.to_csv(output_path, index=False, chunksize=WRITE_CHUNK_SIZE, compression='infer')
+
+
+def write_xlsx_streaming(df, output_path, max_rows=XLSX_MAX_ROWS):
+    """
+    XLSX dengan openpyxl write-only (memori konstan, baris langsung di-stream ke disk).
+    Data di atas batas baris XLSX otomatis dipecah ke sheet berikutnya
+    (Sheet1, Sheet2, ...) sehingga tidak ada baris yang terpotong; workbook
+    yang dipecah diberi SPLIT_SHEET_MARKER agar pembaca menggabungkan sheet lanjutan.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    if len(df) > max_rows:
+        workbook.properties.keywords = SPLIT_SHEET_MARKER
+    header = [str(col) for col in df.columns]
+
+    for sheet_number, sheet_start in enumerate(range(0, max(len(df), 1), max_rows), start=1):
+        sheet = workbook.create_sheet(f"Sheet{sheet_number}")
+        sheet.append(header)
+
+        sheet_stop = min(sheet_start + max_rows, len(df))
+        for chunk_start in range(sheet_start, sheet_stop, WRITE_CHUNK_SIZE):
+            chunk = df.iloc[chunk_start:min(chunk_start + WRITE_CHUNK_SIZE, sheet_stop)]
+            # NaN tidak valid di XLSX: tulis sebagai sel kosong
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            for row in chunk.itertuples(index=False, name=None):
+                sheet.append(row)
+
+    workbook.save(output_path)
+
+
+WRITERS = {
+    'parquet': write_parquet,
+    'csv': write_csv,
+    'xlsx': write_xlsx_streaming,
+}
+
+
+def infer_format(output_path):
+    """Menentukan format output dari ekstensi file (misal data.csv.gz -> csv)"""
+    suffixes = [suffix.lower().lstrip('.') for suffix in Path(output_path).suffixes]
+    for suffix in suffixes:
+        if suffix in WRITERS:
+            return suffix
+    raise ValueError(f"Format output tidak dikenali untuk '{output_path}'. Gunakan: {', '.join(WRITERS)}")
+
+
+def write_output(df, output_path, fmt=None):
+    """Menulis DataFrame dengan writer sesuai format; mengembalikan durasi tulis (detik)"""
+    writer = WRITERS[fmt or infer_format(output_path)]
+    start = time.perf_counter()
+    writer(df, output_path)
+    return time.perf_counter() - start
+
+
+def benchmark_writers(df, output_dir, name="benchmark"):
+    """Membandingkan waktu tulis dan ukuran file setiap format output"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    targets = {
+        'parquet': output_dir / f"{name}.parquet",
+        'csv.gz': output_dir / f"{name}.csv.gz",
+        'xlsx (streaming)': output_dir / f"{name}.xlsx",
+    }
+
+    results = []
+    for label, path in targets.items():
+        try:
+            seconds = write_output(df, path)
+            results.append({'format': label, 'detik': round(seconds, 3), 'ukuran_mb': round(os.path.getsize(path) / 1e6, 2)})
+        except ImportError as error:
+            results.append({'format': label, 'detik': None, 'ukuran_mb': None, 'catatan': str(error)})
+
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    # Contoh: python writers.py dataset_stunting_preprocessed.xlsx --output-dir benchmark_output
+    parser = argparse.ArgumentParser(description="Benchmark format output preprocessing")
+    parser.add_argument("input", help="File data (.xlsx/.csv) yang akan ditulis ulang")
+    parser.add_argument("--output-dir", default="benchmark_output")
+    args = parser.parse_args()
+
+    if args.input.lower().endswith('.csv'):
+        data = pd.read_csv(args.input)
+    else:
+        data = read_excel_sheets(args.input)
+    print(benchmark_writers(data, args.output_dir).to_string(index=False))